@@ -1,31 +1,44 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from gtts import gTTS
-from io import BytesIO
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.services.documents import get_document
+from app.services.tts import speech
 
 router = APIRouter()
 
 class AudioRequest(BaseModel):
     text: str
 
-@router.post("/generate")
-async def generate_audio(request: AudioRequest):
+async def stream_audio(text: str):
+    # Wait for the first segment so a failing backend still gets a proper 500
+    segments = speech.stream(text)
     try:
-        # Create a file-like object in memory
-        mp3_fp = BytesIO()
-        
-        # Generate speech (English)
-        # We limit text to 500 chars for the demo to keep it fast
-        tts = gTTS(text=request.text[:1000], lang='en', slow=False)
-        tts.write_to_fp(mp3_fp)
-        
-        # Reset pointer to the start of the file
-        mp3_fp.seek(0)
-        
-        # Stream the audio back to the browser
-        return StreamingResponse(mp3_fp, media_type="audio/mp3")
-
+        first = await anext(segments)
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="No text to read")
     except Exception as e:
+        await segments.aclose()
         print(f"Audio Error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate audio")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to generate audio")
+
+    async def body():
+        yield first
+        async for chunk in segments:
+            yield chunk
+
+    # Stream the audio back to the browser, segment by segment
+    return StreamingResponse(body(), media_type="audio/mpeg")
+
+@router.post("/generate")
+async def generate_audio(request: AudioRequest):
+    return await stream_audio(request.text)
+
+@router.get("/documents/{doc_id}")
+async def document_audio(doc_id: int, db: AsyncSession = Depends(get_db)):
+    """Reads a paper's summary aloud; usable directly as an <audio> src."""
+    doc = await get_document(db, doc_id)
+    if not doc.summary:
+        raise HTTPException(status_code=409, detail="Document is still processing")
+    return await stream_audio(doc.summary)
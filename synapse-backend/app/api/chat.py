@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.gemini_service import gemini_ai
 from app.core.database import get_db
-from app.models.models import Document
+from app.models.models import ChatMessage, ChatSession
+from app.services.chat_sessions import SESSION_PASSAGE_TOKENS, get_or_create_session, history_prompt, record_turn
+from app.services.documents import get_document, load_raw_text
+from app.services.retrieval import CONTEXT_TOKENS, select_passages
+import json
 
 router = APIRouter()
 
@@ -12,48 +18,153 @@ class ChatRequest(BaseModel):
     doc_id: int | None = None
     mode: str = "Standard"
     audience: str = "Undergrad"
-@router.post("/ask")
-async def ask_question(request: ChatRequest, db: Session = Depends(get_db)):
+    # Multi-turn: pass user_id to start a session, then the returned session_id
+    session_id: str | None = None
+    user_id: str | None = None
+
+class SessionCreate(BaseModel):
+    user_id: str
+    doc_id: int | None = None
+
+audience_prompts = {
+    "Child": "Explain simply using analogies, as if to a 5-year-old.",
+    "High School": "Explain clearly avoiding heavy jargon, suitable for a high school student.",
+    "Undergrad": "Use standard academic tone suitable for a college student.",
+    "Expert": "Use highly technical, dense, and precise language suitable for a PhD researcher."
+}
+
+mode_prompts = {
+    "Standard": "You are a helpful assistant.",
+    "Critic": "You are a skeptical peer reviewer. Aggressively challenge assumptions and look for weaknesses.",
+    "Viva": "You are a Viva examiner. Ask 3 tough follow-up questions to test the student's depth.",
+    "Flaws": "Focus ONLY on methodology flaws, bias, and missing data."
+}
+
+async def build_prompt(request: ChatRequest, db: AsyncSession, session: ChatSession | None = None) -> str:
     context_text = ""
-    
-    # 1. If a specific document is selected, fetch its text
-    if request.doc_id:
-        doc = db.query(Document).filter(Document.id == request.doc_id).first()
-        if not doc:
-            raise HTTPException(status_code=404, detail="Document not found")
-        
-        # We limit text to ~50,000 characters to be safe with speed/limits
-        # (Average paper is 20k-40k chars)
-        context_text = doc.raw_text[:50000] 
-        
-    audience_prompts = {
-        "Child": "Explain simply using analogies, as if to a 5-year-old.",
-        "High School": "Explain clearly avoiding heavy jargon, suitable for a high school student.",
-        "Undergrad": "Use standard academic tone suitable for a college student.",
-        "Expert": "Use highly technical, dense, and precise language suitable for a PhD researcher."
-        }
-    
-    mode_prompts = {
-        "Standard": "You are a helpful assistant.",
-        "Critic": "You are a skeptical peer reviewer. Aggressively challenge assumptions and look for weaknesses.",
-        "Viva": "You are a Viva examiner. Ask 3 tough follow-up questions to test the student's depth.",
-        "Flaws": "Focus ONLY on methodology flaws, bias, and missing data."
-    }
-        
-    sys_instruction = f"""
+    doc_id = session.doc_id if session else request.doc_id
+
+    # 1. If a specific document is selected, send its summary plus the passages
+    # most relevant to the question (whole paper is searched, not just the start).
+    # Sessions reuse the header they stored and keep a smaller passage budget.
+    if doc_id:
+        doc = await get_document(db, doc_id)
+        passages = await select_passages(
+            db, doc.content_hash, request.question, load_text=lambda: load_raw_text(db, doc.content_hash),
+            token_budget=SESSION_PASSAGE_TOKENS if session else CONTEXT_TOKENS,
+        )
+        header = session.context if session and session.context else f"Paper: {doc.filename}\nSummary: {doc.summary}"
+        context_text = f"{header}\n\n" + "\n\n".join(
+            f"[Passage {i + 1}] {p}" for i, p in enumerate(passages)
+        )
+
+    system_instruction = f"""
     {mode_prompts.get(request.mode, "You are a helpful assistant.")}
     {audience_prompts.get(request.audience, "Use standard academic tone.")}
-    
+
     Answer based on the context below.
     --- CONTEXT ---
     {context_text}
     """
 
-    # 2. Send to Gemini
+    # 2. Conversation so far: running summary + the newest turns, within a fixed budget
+    history = await history_prompt(db, session) if session else ""
+    if history:
+        system_instruction += f"\n    --- CONVERSATION SO FAR ---\n{history}\n"
+    return f"{system_instruction}\n\nUser Question: {request.question}"
+
+async def open_session(request: ChatRequest, db: AsyncSession) -> ChatSession | None:
+    if not (request.session_id or request.user_id):
+        return None  # Stateless, single question
+    return await get_or_create_session(db, request.session_id, request.user_id, request.doc_id)
+
+@router.post("/ask")
+async def ask_question(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+    session = await open_session(request, db)
+    prompt = await build_prompt(request, db, session)
+
+    # 3. Send to Gemini
     try:
-        prompt = f"{system_instruction}\n\nUser Question: {request.question}"
-        answer = await gemini_ai.generate_response(prompt)
-        return {"answer": answer}
+        answer = await gemini_ai.generate_response(prompt, raise_errors=True)
     except Exception as e:
         print(f"Chat Error: {e}")
-        return {"answer": "Sorry, I encountered an error processing your request."}
\ No newline at end of file
+        return {"answer": "Sorry, I encountered an error processing your request.", "session_id": session and session.id}
+
+    if session:
+        await record_turn(session.id, session.doc_id, request.question, answer)
+    return {"answer": answer, "session_id": session and session.id}
+
+def sse(data: dict, event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: ChatRequest, http_request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Same as /ask, but sends the answer as Server-Sent Events while Gemini writes it:
+    `event: session` first (multi-turn only), `data: {"delta": "..."}` per chunk,
+    then `event: done` (or `event: error`).
+    """
+    session = await open_session(request, db)
+    prompt = await build_prompt(request, db, session)
+
+    async def event_stream():
+        if session:
+            yield sse({"session_id": session.id}, event="session")
+
+        # Closing this generator (Starlette does so when the client goes away)
+        # closes stream_response, which stops reading from Gemini.
+        answer = gemini_ai.stream_response(prompt)
+        parts = []
+        try:
+            async for delta in answer:
+                if await http_request.is_disconnected():
+                    break
+                parts.append(delta)
+                yield sse({"delta": delta})
+            else:
+                # Only complete answers become part of the session history
+                if session:
+                    await record_turn(session.id, session.doc_id, request.question, "".join(parts))
+                yield sse({}, event="done")
+        except Exception as e:
+            print(f"Chat Stream Error: {e}")
+            yield sse({"error": "Sorry, I encountered an error processing your request."}, event="error")
+        finally:
+            await answer.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# --- Sessions ---
+
+@router.post("/sessions")
+async def create_session(req: SessionCreate, db: AsyncSession = Depends(get_db)):
+    session = await get_or_create_session(db, None, req.user_id, req.doc_id)
+    return {"session_id": session.id, "doc_id": session.doc_id}
+
+@router.get("/sessions")
+async def list_sessions(user_id: str, db: AsyncSession = Depends(get_db)):
+    rows = await db.execute(
+        select(ChatSession.id, ChatSession.doc_id, ChatSession.created_at, ChatSession.updated_at)
+        .where(ChatSession.user_id == user_id)
+        .order_by(ChatSession.updated_at.desc())
+        .limit(50)
+    )
+    return [row._asdict() for row in rows.all()]
+
+@router.get("/sessions/{session_id}")
+async def get_session_messages(session_id: str, db: AsyncSession = Depends(get_db)):
+    """The newest 100 messages of a session, oldest first."""
+    session = await get_or_create_session(db, session_id, None, None)
+    messages = (await db.scalars(
+        select(ChatMessage).where(ChatMessage.session_id == session.id).order_by(ChatMessage.id.desc()).limit(100)
+    )).all()
+    return {
+        "session_id": session.id,
+        "doc_id": session.doc_id,
+        "messages": [{"role": m.role, "content": m.content, "timestamp": m.timestamp} for m in reversed(messages)],
+    }
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.services.artifacts import citation_prompt, document_artifact
+from app.services.documents import get_document
 from app.services.gemini_service import gemini_ai
 
 router = APIRouter()
 
+# A citation for a given snippet never changes
+CACHE_TTL = 30 * 24 * 3600
+
 class CitationRequest(BaseModel):
     filename: str
     text_snippet: str # We pass the summary or first page text
@@ -11,24 +18,18 @@ class CitationRequest(BaseModel):
 
 @router.post("/generate")
 async def generate_citation(request: CitationRequest):
-    # Prompt engineering to force the AI to act like a librarian
-    prompt = f"""
-    Act as a strictly academic librarian. 
-    Based on the following text snippet from a research paper, generate a correct {request.format} citation.
-    
-    Filename: "{request.filename}"
-    Context Text: "{request.text_snippet[:3000]}"
-    
-    Rules:
-    1. Extract the title, authors, and year if possible.
-    2. If information is missing, use "n.d." or "Unknown" as per standard rules.
-    3. Return ONLY the citation string. Do not add "Here is the citation".
-    """
+    prompt = citation_prompt(request.format, request.text_snippet, request.filename)
     
     try:
-        citation = await gemini_ai.generate_response(prompt)
+        citation = await gemini_ai.generate_response(prompt, cache=True, ttl=CACHE_TTL)
         # Clean up any potential markdown wrappers the AI might add
         clean_citation = citation.replace("```", "").strip()
         return {"citation": clean_citation}
     except Exception as e:
-        raise HTTPException(status_code=500, detail="Could not generate citation")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Could not generate citation")
+
+@router.get("/{doc_id}")
+async def get_document_citation(doc_id: int, format: str = "APA", db: AsyncSession = Depends(get_db)):
+    """Stored citation of an uploaded paper, one per format."""
+    doc = await get_document(db, doc_id)
+    return await document_artifact(db, doc, f"citation:{format.lower()}")
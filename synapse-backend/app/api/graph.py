@@ -1,43 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.services.artifacts import GraphData, document_artifact, graph_prompt
+from app.services.documents import get_document
 from app.services.gemini_service import gemini_ai
-import json
 
 router = APIRouter()
 
+# The graph is re-requested on every page load of the same summary
+CACHE_TTL = 24 * 3600
+
 class GraphRequest(BaseModel):
     summary: str
 
 @router.post("/generate")
 async def generate_graph(request: GraphRequest):
     # We ask Gemini to give us strictly formatted JSON
-    prompt = f"""
-    Based on this research summary, create a Knowledge Graph JSON.
-    Identify 5-7 core concepts (nodes) and how they relate (links).
-    
-    Summary: "{request.summary[:1000]}"
-    
-    Return ONLY raw JSON in this exact format (no markdown code blocks):
-    {{
-        "nodes": [
-            {{"id": "Main Topic", "group": 1}},
-            {{"id": "Sub Concept A", "group": 2}}
-        ],
-        "links": [
-            {{"source": "Main Topic", "target": "Sub Concept A"}}
-        ]
-    }}
-    """
+    prompt = graph_prompt(request.summary)
     
     try:
-        # Get response
-        raw_response = await gemini_ai.generate_response(prompt)
-        
-        # Clean the response (sometimes AI adds ```json ... ``` wrapper)
-        cleaned_response = raw_response.replace("```json", "").replace("```", "").strip()
-        
-        graph_data = json.loads(cleaned_response)
-        return graph_data
+        # Validated (and repaired if needed) by the JSON helper; only valid graphs are cached
+        return await gemini_ai.generate_json(prompt, GraphData, cache=True, ttl=CACHE_TTL)
         
     except Exception as e:
         print(f"Graph Error: {e}")
@@ -45,4 +29,10 @@ async def generate_graph(request: GraphRequest):
         return {
             "nodes": [{"id": "Error", "group": 1}],
             "links": []
-        }
\ No newline at end of file
+        }
+
+@router.get("/{doc_id}")
+async def get_document_graph(doc_id: int, db: AsyncSession = Depends(get_db)):
+    """Stored graph of an uploaded paper (built at ingest or on first view)."""
+    doc = await get_document(db, doc_id)
+    return await document_artifact(db, doc, "graph")
@@ -1,31 +1,107 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.models.models import GlossaryTerm
+from app.services.documents import get_document
 from app.services.gemini_service import gemini_ai
+from app.services.glossary import explain_terms, lookup_terms, normalize_term, store_terms
 
 router = APIRouter()
 
+# Same term + context always gets the same explanation
+CACHE_TTL = 7 * 24 * 3600
+MAX_BATCH_TERMS = 100
+
 class ExplainRequest(BaseModel):
     text: str
     context: str = ""
+    doc_id: int | None = None     # Answer from the document's precomputed glossary when possible
+
+class ExplainBatchRequest(BaseModel):
+    terms: list[str]
+    doc_id: int | None = None
+
+async def glossary_hash(db: AsyncSession, doc_id: int | None) -> str | None:
+    """Content hash whose glossary can answer for this document, if any."""
+    if not doc_id:
+        return None
+    doc = await get_document(db, doc_id)
+    return doc.content_hash if doc.status == "ready" else None
 
 @router.post("/explain")
-async def explain_term(request: ExplainRequest):
+async def explain_term(request: ExplainRequest, db: AsyncSession = Depends(get_db)):
+    # 1. Precomputed glossary (no AI call)
+    content_hash = await glossary_hash(db, request.doc_id)
+    if content_hash:
+        found = await lookup_terms(db, content_hash, [request.text])
+        if request.text in found:
+            return {"term": request.text, "explanation": found[request.text]}
+
+    # 2. Ask Gemini
     prompt = f"""
     Explain the term "{request.text}" simply (like I am 5 years old).
     Context: "{request.context[:200]}"
     Keep the answer extremely concise (max 2 sentences).
     """
-    
+
     try:
-        explanation = await gemini_ai.generate_response(prompt)
-        
-        # Check if Google returned an error inside the text response
-        if "quota" in explanation.lower() or "429" in explanation:
-            return {"term": request.text, "explanation": "⚠️ AI Daily Limit Reached. Please wait a moment."}
-            
-        return {"term": request.text, "explanation": explanation}
-        
+        # Errors raise (and are never cached or stored) instead of coming back as text
+        explanation = await gemini_ai.generate_response(prompt, cache=True, ttl=CACHE_TTL, raise_errors=True)
     except Exception as e:
         print(f"Lens Error: {e}")
+        if "quota" in str(e).lower() or "429" in str(e):
+            return {"term": request.text, "explanation": "⚠️ AI Daily Limit Reached. Please wait a moment."}
         # Return a polite error instead of crashing
-        return {"term": request.text, "explanation": "⚠️ System is busy. Try again later."}
\ No newline at end of file
+        return {"term": request.text, "explanation": "⚠️ System is busy. Try again later."}
+
+    # 3. Remember it for the next reader of this paper
+    if content_hash:
+        norm = normalize_term(request.text)
+        await store_terms(db, content_hash, {norm: explanation}, {norm: request.text})
+        await db.commit()
+
+    return {"term": request.text, "explanation": explanation}
+
+@router.post("/explain/batch")
+async def explain_batch(request: ExplainBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Explains many terms in one request: glossary hits first, the rest in batched prompts."""
+    terms = list(dict.fromkeys(t.strip() for t in request.terms if t.strip()))
+    if len(terms) > MAX_BATCH_TERMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TERMS} terms per request")
+
+    content_hash = await glossary_hash(db, request.doc_id)
+    explanations = await lookup_terms(db, content_hash, terms) if content_hash else {}
+
+    missing = [t for t in terms if t not in explanations]
+    if missing:
+        try:
+            explained = await explain_terms(missing)
+        except Exception as e:
+            print(f"Lens Batch Error: {e}")
+            explained = {}
+        for term in missing:
+            if normalize_term(term) in explained:
+                explanations[term] = explained[normalize_term(term)]
+        if content_hash and explained:
+            await store_terms(db, content_hash, explained, {normalize_term(t): t for t in missing})
+            await db.commit()
+
+    return {
+        "explanations": explanations,
+        "missing": [t for t in terms if t not in explanations],
+    }
+
+@router.get("/glossary/{doc_id}")
+async def get_glossary(doc_id: int, db: AsyncSession = Depends(get_db)):
+    """Every precomputed term of a document, so the client can answer most lookups locally."""
+    content_hash = await glossary_hash(db, doc_id)
+    if not content_hash:
+        return {"terms": []}
+    rows = await db.execute(
+        select(GlossaryTerm.term, GlossaryTerm.explanation)
+        .where(GlossaryTerm.content_hash == content_hash)
+        .order_by(GlossaryTerm.id)
+    )
+    return {"terms": [{"term": r.term, "explanation": r.explanation} for r in rows.all()]}
@@ -1,36 +1,54 @@
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.models.models import Memory
-from app.services.gemini_service import gemini_ai
+from app.services.memory_tags import queue_tagging
+from app.services.search import index_memories
 
 router = APIRouter()
 
+MEMORY_BULK_MAX = 2000
+
 class MemoryCreate(BaseModel):
     user_id: str
     content: str
 
+class MemoryBulkCreate(BaseModel):
+    user_id: str
+    notes: list[str] = Field(..., min_length=1, max_length=MEMORY_BULK_MAX)
+
 @router.post("/add")
-async def add_memory(mem: MemoryCreate, db: Session = Depends(get_db)):
-    # 1. Ask AI to generate tags for organization
-    prompt = f"""
-    Analyze this short user note and generate 3 relevant topic tags (one word each).
-    Note: "{mem.content}"
-    Return ONLY comma-separated tags. Example: "DeepLearning, Optimization, History"
-    """
-    tags = await gemini_ai.generate_response(prompt)
-    
-    # 2. Save to DB
-    new_mem = Memory(
-        user_id=mem.user_id,
-        content=mem.content,
-        tags=tags.replace("\n", "").strip()
-    )
+async def add_memory(mem: MemoryCreate, db: AsyncSession = Depends(get_db)):
+    # 1. Save to DB right away
+    new_mem = Memory(user_id=mem.user_id, content=mem.content, tag_status="pending")
     db.add(new_mem)
-    db.commit()
+    await db.flush()
+    index_memories(db, [new_mem])
+    await db.commit()
+
+    # 2. AI tags for organization are added in the background
+    await queue_tagging(db, [new_mem.id])
     return new_mem
 
+@router.post("/bulk")
+async def add_memories_bulk(req: MemoryBulkCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Imports many notes in one transaction; they are tagged afterwards in batches
+    (many notes per prompt). Tags appear on /list as each batch finishes.
+    """
+    notes = [Memory(user_id=req.user_id, content=content, tag_status="pending") for content in req.notes if content.strip()]
+    db.add_all(notes)
+    await db.flush()
+    index_memories(db, notes)
+    await db.commit()
+
+    ids = [m.id for m in notes]
+    await queue_tagging(db, ids)
+    return {"count": len(ids), "ids": ids}
+
 @router.get("/list")
-def get_memories(user_id: str, db: Session = Depends(get_db)):
-    return db.query(Memory).filter(Memory.user_id == user_id).order_by(Memory.timestamp.desc()).all()
\ No newline at end of file
+async def get_memories(user_id: str, db: AsyncSession = Depends(get_db)):
+    result = await db.scalars(select(Memory).where(Memory.user_id == user_id).order_by(Memory.timestamp.desc()))
+    return result.all()
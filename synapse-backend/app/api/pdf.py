@@ -1,87 +1,188 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form
-from sqlalchemy.orm import Session
-from pypdf import PdfReader
-from io import BytesIO
-from app.services.gemini_service import gemini_ai
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Form, Query
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.compare import compare_documents
+from app.services.ingest import content_hash, discard_upload, ingest_pool, save_upload
+from app.services.job_queue import QueueFullError
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.related import related_documents
+from app.services.search import index_documents
 from app.core.database import get_db
-from app.models.models import Document
+from app.models.models import Document, DocumentContent, IngestJob
 from pydantic import BaseModel
+from datetime import datetime
+import asyncio
+import uuid
 router = APIRouter()
 
+def upload_response(doc: Document, content: DocumentContent | None, job_id: str | None = None):
+    return {
+        "id": doc.id,
+        "job_id": job_id,
+        "filename": doc.filename,
+        "status": doc.status,
+        "summary": content.summary if content and doc.status == "ready" else None,
+    }
+
 @router.post("/upload")
 async def upload_pdf(
     file: UploadFile = File(...), 
     user_id: str = Form(...), # <--- Receive User ID from Frontend Form
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    """
+    Files are content-addressed: a PDF that was already ingested (by anyone) only
+    gets a new per-user link and comes back "ready" with its summary. New files are
+    stored and queued for ingestion (extract -> index -> summarize); poll
+    /api/pdf/jobs/{job_id} until status is "ready".
+    """
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    try:
-        # 1. Read PDF
-        contents = await file.read()
-        pdf_file = BytesIO(contents)
-        reader = PdfReader(pdf_file)
-        
-        text = ""
-        for page in reader.pages[:10]: 
-            text += page.extract_text() + "\n"
-
-        if not text.strip():
-             raise HTTPException(status_code=400, detail="Could not extract text.")
-
-        # 2. AI Summary
-        prompt = f"Analyze this research paper. Provide a summary and 3 key takeaways. Text: {text[:4000]}"
-        summary = await gemini_ai.generate_response(prompt)
-
-        # 3. SAVE TO DATABASE
-        new_doc = Document(
-            user_id=user_id, # Save the user_id
-            filename=file.filename,
-            summary=summary,
-            raw_text=text 
-        )
+    # 1. Hash the file
+    contents = await file.read()
+    file_hash = await asyncio.to_thread(content_hash, contents)
+
+    # 2. Same user, same file: return the existing document
+    existing = await db.scalar(
+        select(Document).where(Document.user_id == user_id, Document.content_hash == file_hash)
+    )
+    content = await db.get(DocumentContent, file_hash)
+    if existing and existing.status != "failed":
+        return upload_response(existing, content, await active_job_id(db, file_hash))
+
+    # 3. Known file: link it, no extraction or AI call
+    if content and content.status != "failed":
+        new_doc = existing or Document(user_id=user_id, filename=file.filename, content_hash=file_hash)
+        new_doc.status = content.status
         db.add(new_doc)
-        db.commit()
-        db.refresh(new_doc)
+        if content.status == "ready":
+            await db.flush()
+            await index_documents(db, [new_doc], content.summary)
+        await db.commit()
+        return upload_response(new_doc, content, await active_job_id(db, file_hash))
+
+    # 4. New (or previously failed) file: hold a queue slot, store it and queue ingestion.
+    # Checking full() alone would go stale across the awaits below.
+    try:
+        ingest_pool.reserve()
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Too many uploads in progress. Please retry shortly.")
+
+    try:
+        file_path = await asyncio.to_thread(save_upload, contents)
+        try:
+            if content is None:
+                content = DocumentContent(content_hash=file_hash)
+                db.add(content)
+            content.status = "queued"
+            new_doc = existing or Document(user_id=user_id, filename=file.filename, content_hash=file_hash)
+            new_doc.status = "queued"
+            db.add(new_doc)
+            await db.flush()
+            job = IngestJob(id=uuid.uuid4().hex, content_hash=file_hash, document_id=new_doc.id, file_path=file_path)
+            db.add(job)
+            await db.commit()
+        except IntegrityError:
+            # Someone uploaded the same new file at the same moment; link to theirs,
+            # unless that someone was this user (then their link is returned as is)
+            await db.rollback()
+            discard_upload(file_path)
+            content = await db.get(DocumentContent, file_hash)
+            new_doc = await db.scalar(
+                select(Document).where(Document.user_id == user_id, Document.content_hash == file_hash)
+            )
+            if new_doc is None:
+                new_doc = Document(user_id=user_id, filename=file.filename, content_hash=file_hash, status=content.status)
+                db.add(new_doc)
+                await db.commit()
+            return upload_response(new_doc, content, await active_job_id(db, file_hash))
+    finally:
+        ingest_pool.release()
+
+    # No await since release(), so the slot is still free
+    ingest_pool.submit(job.id)
+
+    return upload_response(new_doc, content, job.id)
 
-        return {
-            "id": new_doc.id,
-            "filename": new_doc.filename,
-            "summary": new_doc.summary
-        }
+async def active_job_id(db: AsyncSession, file_hash: str):
+    return await db.scalar(
+        select(IngestJob.id)
+        .where(IngestJob.content_hash == file_hash)
+        .order_by(IngestJob.created_at.desc())
+        .limit(1)
+    )
 
-    except Exception as e:
-        print(f"Error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to process PDF")
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(IngestJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    content = await db.get(DocumentContent, job.content_hash)
 
-# --- FIX IS HERE ---
-@router.get("/list")
-def get_documents(user_id: str, db: Session = Depends(get_db)): # <--- Added user_id: str here
-    # Now 'user_id' is defined and can be used in the filter below
-    return db.query(Document).filter(Document.user_id == user_id).order_by(Document.upload_date.desc()).all()
+    return {
+        "job_id": job.id,
+        "stage": job.stage,
+        "page_count": job.page_count,
+        "pages_done": job.pages_done,
+        "status": content.status,
+        "error": job.error,
+        "summary": content.summary if content.status == "ready" else None,
+    }
+
+class DocumentListItem(BaseModel):
+    id: int
+    filename: str
+    upload_date: datetime
+    status: str | None = None
+    preview: str | None = None
+
+class DocumentListResponse(BaseModel):
+    items: list[DocumentListItem]
+    next_cursor: str | None = None
+
+@router.get("/list", response_model=DocumentListResponse)
+async def get_documents(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Newest first, metadata only (never raw_text or the full summary).
+    Pass the returned next_cursor to get the following page.
+    """
+    q = (
+        select(Document.id, Document.filename, Document.upload_date, Document.status, DocumentContent.preview)
+        .outerjoin(DocumentContent, Document.content_hash == DocumentContent.content_hash)
+        .where(Document.user_id == user_id)
+    )
+    if cursor:
+        # Keyset pagination over (upload_date, id), served by ix_documents_user_upload
+        q = q.where(tuple_(Document.upload_date, Document.id) < decode_cursor(cursor))
+
+    rows = (await db.execute(q.order_by(Document.upload_date.desc(), Document.id.desc()).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].upload_date, rows[-1].id)
+
+    return {"items": [row._asdict() for row in rows], "next_cursor": next_cursor}
+
+@router.get("/related/{doc_id}")
+async def get_related(doc_id: int, limit: int = Query(5, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    """Most similar papers in the owner's library, from locally stored term vectors (no AI call)."""
+    return {"doc_id": doc_id, "items": await related_documents(db, doc_id, limit)}
 
 class CompareRequest(BaseModel):
-    doc1_id: int
-    doc2_id: int
+    doc_ids: list[int] = []
+    # Older clients compare exactly two papers
+    doc1_id: int | None = None
+    doc2_id: int | None = None
 
 @router.post("/compare")
-async def compare_docs(req: CompareRequest, db: Session = Depends(get_db)):
-    d1 = db.query(Document).filter(Document.id == req.doc1_id).first()
-    d2 = db.query(Document).filter(Document.id == req.doc2_id).first()
-    
-    if not d1 or not d2: raise HTTPException(404, detail="Docs not found")
-
-    prompt = f"""
-    Compare these two research papers side-by-side.
-    Create a Markdown table comparing them on: Methodology, Dataset, Core Findings, and Weaknesses.
-    
-    Paper 1: {d1.filename}
-    Summary 1: {d1.summary}
-    
-    Paper 2: {d2.filename}
-    Summary 2: {d2.summary}
-    """
-    
-    response = await gemini_ai.generate_response(prompt)
-    return {"comparison": response}
\ No newline at end of file
+async def compare_docs(req: CompareRequest, db: AsyncSession = Depends(get_db)):
+    doc_ids = req.doc_ids or [i for i in (req.doc1_id, req.doc2_id) if i is not None]
+    return await compare_documents(db, doc_ids)
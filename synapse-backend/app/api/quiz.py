@@ -1,42 +1,33 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_db
+from app.services.artifacts import QuizQuestion, document_artifact, quiz_prompt
+from app.services.documents import get_document
 from app.services.gemini_service import gemini_ai
-import json
 
 router = APIRouter()
 
+# The quiz is re-requested on every page load of the same summary
+CACHE_TTL = 24 * 3600
+
 class QuizRequest(BaseModel):
     text: str
 
 @router.post("/generate")
 async def generate_quiz(request: QuizRequest):
     # Strict prompt to force JSON format
-    prompt = f"""
-    Based on the following research summary, create a quiz with 5 Multiple Choice Questions.
-    
-    Summary: "{request.text[:3000]}"
-    
-    Return ONLY a raw JSON array. Do not use Markdown blocks.
-    Format example:
-    [
-        {{
-            "id": 1,
-            "question": "What is the main finding?",
-            "options": ["A", "B", "C", "D"],
-            "answer": "A"
-        }}
-    ]
-    """
+    prompt = quiz_prompt(request.text)
     
     try:
-        response_text = await gemini_ai.generate_response(prompt)
-        
-        # Clean up if AI adds ```json ... ``` wrappers
-        clean_text = response_text.replace("```json", "").replace("```", "").strip()
-        
-        quiz_data = json.loads(clean_text)
-        return quiz_data
+        return await gemini_ai.generate_json(prompt, list[QuizQuestion], cache=True, ttl=CACHE_TTL)
         
     except Exception as e:
         print(f"Quiz Gen Error: {e}")
-        raise HTTPException(status_code=500, detail="Failed to generate quiz")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to generate quiz")
+
+@router.get("/{doc_id}")
+async def get_document_quiz(doc_id: int, db: AsyncSession = Depends(get_db)):
+    """Stored quiz of an uploaded paper (built at ingest or on first view)."""
+    doc = await get_document(db, doc_id)
+    return await document_artifact(db, doc, "quiz")
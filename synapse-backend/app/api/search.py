@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+from app.core.database import get_db
+from app.services.search import search
+
+router = APIRouter()
+
+@router.get("/")
+async def search_library(
+    user_id: str,
+    q: str = "",
+    kind: Literal["memory", "document"] | None = None,
+    tag: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Ranked full-text search over the user's memories and documents (filenames and
+    summaries). Without `q` it lists newest first. `facets` counts the tags of
+    every matching memory; pass one back as `tag` to filter.
+    """
+    return await search(db, user_id, q, kind=kind, tag=tag, limit=limit, offset=offset)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Body, Query
+from sqlalchemy import and_, func, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
-from app.models.models import Question, Answer
+from app.models.models import Question, Answer, AnswerVote
 from app.services.gemini_service import gemini_ai
+from app.services.ai_answers import answer_pool
+from app.services.job_queue import QueueFullError
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.social_cache import answers_cache, answer_dict, feed_cache, invalidate_feed, invalidate_question
 from pydantic import BaseModel
 from typing import List
 
@@ -18,66 +24,171 @@ class AnswerCreate(BaseModel):
     question_id: int
     content: str
 
+class VoteRequest(BaseModel):
+    user_id: str  # Required: one vote per user cannot be skipped by leaving it out
+
 # 1. Post a Question (Triggers Hybrid AI Layer)
 @router.post("/questions")
-async def create_question(q: QuestionCreate, db: Session = Depends(get_db)):
+async def create_question(q: QuestionCreate, db: AsyncSession = Depends(get_db)):
     # A. Save User Question
-    new_q = Question(user_id=q.user_id, title=q.title, content=q.content)
+    new_q = Question(user_id=q.user_id, title=q.title, content=q.content, ai_status="pending")
     db.add(new_q)
-    db.commit()
-    db.refresh(new_q)
+    await db.commit()
+    invalidate_feed()
 
-    # B. Trigger AI Answer (The Hybrid Layer)
+    # B. Queue the AI Answer (The Hybrid Layer) - written in the background with retry
     try:
-        ai_prompt = f"Answer this academic question concisely: {q.title} - {q.content}"
-        ai_response = await gemini_ai.generate_response(ai_prompt)
-        
-        ai_answer = Answer(
-            question_id=new_q.id,
-            user_id="Synapse AI",
-            content=ai_response,
-            is_ai=1,
-            votes=10 # AI starts with some credibility
-        )
-        db.add(ai_answer)
-        db.commit()
-    except Exception as e:
-        print(f"AI Answer Failed: {e}")
+        answer_pool.submit(new_q.id)
+    except QueueFullError:
+        # No AI answer rather than "pending" until a restart; people can still answer
+        new_q.ai_status = "failed"
+        await db.commit()
+        invalidate_feed()
 
     return new_q
 
 # 2. Get Feed
 @router.get("/questions")
-def get_questions(db: Session = Depends(get_db)):
-    return db.query(Question).order_by(Question.timestamp.desc()).limit(20).all()
+async def get_questions(db: AsyncSession = Depends(get_db)):
+    result = await db.scalars(select(Question).order_by(Question.timestamp.desc()).limit(20))
+    return result.all()
+
+def feed_query(limit: int, cursor: str | None):
+    """
+    One statement per page: the page of questions (keyset on timestamp, id) joined
+    to its answer counts and its top answer. The answer aggregates only scan the
+    answers of the questions on this page (ix on answers.question_id).
+    """
+    page = select(Question.id, Question.user_id, Question.title, Question.content, Question.timestamp, Question.ai_status)
+    if cursor:
+        page = page.where(tuple_(Question.timestamp, Question.id) < decode_cursor(cursor))
+    page = page.order_by(Question.timestamp.desc(), Question.id.desc()).limit(limit + 1).cte("page")
+
+    page_answers = Answer.question_id.in_(select(page.c.id))
+    counts = (
+        select(Answer.question_id, func.count(Answer.id).label("answer_count"))
+        .where(page_answers)
+        .group_by(Answer.question_id)
+        .subquery()
+    )
+    ranked = (
+        select(
+            Answer.question_id, Answer.id, Answer.user_id, Answer.content, Answer.is_ai, Answer.votes,
+            func.row_number().over(partition_by=Answer.question_id, order_by=(Answer.votes.desc(), Answer.id)).label("rank"),
+        )
+        .where(page_answers)
+        .subquery()
+    )
+
+    return (
+        select(
+            page,
+            func.coalesce(counts.c.answer_count, 0).label("answer_count"),
+            ranked.c.id.label("top_id"),
+            ranked.c.user_id.label("top_user_id"),
+            ranked.c.content.label("top_content"),
+            ranked.c.is_ai.label("top_is_ai"),
+            ranked.c.votes.label("top_votes"),
+        )
+        .outerjoin(counts, counts.c.question_id == page.c.id)
+        .outerjoin(ranked, and_(ranked.c.question_id == page.c.id, ranked.c.rank == 1))
+        .order_by(page.c.timestamp.desc(), page.c.id.desc())
+    )
+
+@router.get("/feed")
+async def get_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Newest questions first, each with its answer count and top-voted answer, so the
+    client needs no per-question request. Pass next_cursor to load the next page.
+    """
+    key = (cursor, limit)
+    cached = feed_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rows = (await db.execute(feed_query(limit, cursor))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+    items = [
+        {
+            "id": r.id,
+            "user_id": r.user_id,
+            "title": r.title,
+            "content": r.content,
+            "timestamp": r.timestamp,
+            "ai_pending": r.ai_status == "pending",
+            "answer_count": r.answer_count,
+            "top_answer": None if r.top_id is None else {
+                "id": r.top_id,
+                "user_id": r.top_user_id,
+                "content": r.top_content,
+                "is_ai": r.top_is_ai,
+                "votes": r.top_votes,
+            },
+        }
+        for r in rows
+    ]
+    page = {"items": items, "next_cursor": next_cursor}
+    feed_cache.set(key, page)
+    return page
 
 # 3. Get Specific Question + Answers
 @router.get("/questions/{q_id}")
-def get_question_detail(q_id: int, db: Session = Depends(get_db)):
-    q = db.query(Question).filter(Question.id == q_id).first()
+async def get_question_detail(q_id: int, db: AsyncSession = Depends(get_db)):
+    q = await db.get(Question, q_id)
     if not q:
         raise HTTPException(status_code=404, detail="Not found")
     
-    # Get answers sorted by votes
-    answers = db.query(Answer).filter(Answer.question_id == q_id).order_by(Answer.votes.desc()).all()
-    return {"question": q, "answers": answers}
+    # Get answers sorted by votes (cached until the next vote/answer on this question)
+    answers = answers_cache.get(q_id)
+    if answers is None:
+        rows = await db.scalars(select(Answer).where(Answer.question_id == q_id).order_by(Answer.votes.desc(), Answer.id))
+        answers = [answer_dict(a) for a in rows.all()]
+        answers_cache.set(q_id, answers)
+    return {"question": q, "answers": answers, "ai_pending": q.ai_status == "pending"}
 
 # 4. Post Human Answer
 @router.post("/answers")
-def create_answer(a: AnswerCreate, db: Session = Depends(get_db)):
+async def create_answer(a: AnswerCreate, db: AsyncSession = Depends(get_db)):
     new_a = Answer(question_id=a.question_id, user_id=a.user_id, content=a.content)
     db.add(new_a)
-    db.commit()
+    await db.commit()
+    invalidate_question(new_a.question_id)
     return new_a
 
 # 5. Vote
 @router.post("/answers/{a_id}/vote")
-def vote_answer(a_id: int, db: Session = Depends(get_db)):
-    a = db.query(Answer).filter(Answer.id == a_id).first()
-    if a:
-        a.votes += 1
-        db.commit()
-    return {"votes": a.votes}
+async def vote_answer(a_id: int, vote: VoteRequest, db: AsyncSession = Depends(get_db)):
+    # A. One vote per user (enforced by the unique index, no read-before-write)
+    db.add(AnswerVote(answer_id=a_id, user_id=vote.user_id))
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        votes = await db.scalar(select(Answer.votes).where(Answer.id == a_id))
+        if votes is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"votes": votes, "already_voted": True}
+
+    # B. Atomic increment in the database: no lost updates under concurrent votes
+    row = (await db.execute(
+        update(Answer).where(Answer.id == a_id).values(votes=Answer.votes + 1).returning(Answer.votes, Answer.question_id)
+    )).first()
+    if row is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Not found")
+    await db.commit()
+
+    invalidate_question(row.question_id)
+    return {"votes": row.votes}
 
 # 6. Debate Mode (Devil's Advocate)
 @router.post("/debate")
@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -12,15 +13,46 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+# Pool settings (shared by the sync and async engines)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))  # Postgres only
+
+def async_database_url(url: str) -> str:
+    """Swaps the sync driver for its asyncio counterpart (asyncpg / aiosqlite)."""
+    scheme, rest = url.split("://", 1)
+    driver = scheme.split("+", 1)[0]
+    if driver == "postgresql":
+        return f"postgresql+asyncpg://{rest}"
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
+def engine_options(is_async: bool) -> dict:
+    options = {"pool_pre_ping": POOL_PRE_PING}
+    if DATABASE_URL.startswith("sqlite"):
+        return options
+
+    options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_recycle=POOL_RECYCLE)
+    if is_async:
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(STATEMENT_TIMEOUT_MS)}}
+    else:
+        options["connect_args"] = {"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"}
+    return options
+
+# Sync engine: table creation and the maintenance scripts (init_db, reset_db, migrate_db)
+engine = create_engine(DATABASE_URL, **engine_options(is_async=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: every route and background worker
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **engine_options(is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 # Dependency to get DB session in routes
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
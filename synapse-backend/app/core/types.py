@@ -0,0 +1,69 @@
+import os
+import zlib
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+# Stored values start with a 2-byte header naming the codec. Text written before
+# compression existed never starts with NUL, so it is read back unchanged.
+PLAIN = b"\x00p"
+ZLIB = b"\x00z"
+ZSTD = b"\x00s"
+
+CODEC = os.getenv("TEXT_CODEC", "zstd" if zstandard else "zlib")
+MIN_BYTES = int(os.getenv("TEXT_COMPRESS_MIN_BYTES", "256"))  # Tiny values are not worth it
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+
+def is_encoded(raw) -> bool:
+    return isinstance(raw, (bytes, bytearray, memoryview)) and bytes(raw[:2]) in (PLAIN, ZLIB, ZSTD)
+
+
+def compress_text(value: str) -> bytes:
+    data = value.encode("utf-8")
+    if len(data) < MIN_BYTES:
+        return PLAIN + data
+    if CODEC == "zstd" and zstandard:
+        return ZSTD + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return ZLIB + zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_text(raw) -> str:
+    if isinstance(raw, str):
+        return raw  # Legacy TEXT value (SQLite keeps the original storage class)
+    raw = bytes(raw)
+    header, body = raw[:2], raw[2:]
+    if header == ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if header == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this value (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    if header == PLAIN:
+        return body.decode("utf-8")
+    return raw.decode("utf-8")  # Legacy text converted to bytea without re-encoding
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored compressed (zstd if installed, else zlib) as binary.
+    Behaves like Text in Python; combine with deferred() so large values are only
+    fetched and decompressed when the attribute is read.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress_text(value)
@@ -1,34 +1,170 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey # <--- Added ForeignKey here
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index, DDL, LargeBinary, event, func, literal_column # <--- Added ForeignKey here
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from app.core.database import Base
+from app.core.types import CompressedText
+
+class DocumentContent(Base):
+    """
+    Extracted text + summary of one PDF file, shared by everyone who uploads it.
+    """
+    __tablename__ = "document_contents"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 of the uploaded file
+    raw_text = deferred(Column(CompressedText))          # Only loaded when actually read
+    summary = Column(CompressedText)
+    preview = Column(String(300), nullable=True)         # Start of the summary, for lists
+    page_count = Column(Integer, nullable=True)
+    term_vector = deferred(Column(LargeBinary, nullable=True))  # float32 hashed TF vector, see services.related
+    status = Column(String, default="queued")  # queued -> processing -> ready | failed
+    # Migrated from before deduplication: keyed by sha256 of the old 10-page text, not of the
+    # file. Re-uploading the file re-ingests it and moves these documents over (see ingest)
+    legacy = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Document(Base):
+    """A user's link to a (possibly shared) DocumentContent."""
     __tablename__ = "documents"
+    __table_args__ = (
+        Index("ix_documents_user_hash", "user_id", "content_hash"),
+        Index("ix_documents_user_upload", "user_id", "upload_date", "id"),  # /list keyset pagination
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
     filename = Column(String, index=True)
     upload_date = Column(DateTime, default=datetime.utcnow)
-    summary = Column(Text)
-    raw_text = Column(Text)
+    content_hash = Column(String(64), ForeignKey("document_contents.content_hash"), index=True)
+    status = Column(String, default="ready")  # Mirrors DocumentContent.status
+
+    # Joined so .summary works without a lazy load (not allowed on async sessions).
+    # raw_text stays deferred: read it with services.documents.load_raw_text.
+    content = relationship("DocumentContent", lazy="joined")
+
+    @property
+    def summary(self):
+        return self.content.summary if self.content else None
+
+class DocumentPage(Base):
+    __tablename__ = "document_pages"
+    __table_args__ = (Index("ix_document_pages_hash_page", "content_hash", "page_number", unique=True),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), ForeignKey("document_contents.content_hash"))
+    page_number = Column(Integer)   # 1-based
+    content = Column(CompressedText)
+    error = Column(String, nullable=True)  # "timeout" or the pypdf error if the page was skipped
+
+class DocumentChunk(Base):
+    __tablename__ = "document_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), ForeignKey("document_contents.content_hash"), index=True)
+    ordinal = Column(Integer)       # Position of the chunk in the paper
+    content = Column(CompressedText)
+    terms = Column(Text)            # JSON term -> count, used for BM25 ranking
+    length = Column(Integer)        # Number of indexed terms in the chunk
+
+class DocumentArtifact(Base):
+    """
+    Derived output of one prompt over a document content (graph, quiz, citation, ...).
+    Keyed by content hash rather than document id, so every uploader of the same
+    file shares it. Bumping a kind's prompt version makes old rows unreachable.
+    """
+    __tablename__ = "document_artifacts"
+    __table_args__ = (
+        Index("ix_document_artifacts_key", "content_hash", "kind", "prompt_version", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), ForeignKey("document_contents.content_hash"))
+    kind = Column(String)               # "graph", "quiz", "references", "citation:apa", ...
+    prompt_version = Column(Integer)
+    data = Column(CompressedText)       # JSON, returned as-is by the doc_id endpoints
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class DocumentComparison(Base):
+    """Side-by-side table of a set of documents, assembled from their "profile" artifacts."""
+    __tablename__ = "document_comparisons"
+
+    doc_ids = Column(String, primary_key=True)   # Sorted, comma-separated: "3,8,12"
+    fingerprint = Column(String(64))             # sha256 of the (doc id, content hash) pairs
+    prompt_version = Column(Integer)             # Of the profile artifacts it was built from
+    comparison = Column(CompressedText)          # Markdown table
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class GlossaryTerm(Base):
+    """Precomputed Smart Lens explanation of one term in a document content."""
+    __tablename__ = "glossary_terms"
+    __table_args__ = (
+        Index("ix_glossary_terms_key", "content_hash", "term_norm", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), ForeignKey("document_contents.content_hash"))
+    term = Column(String)               # As it appears in the paper
+    term_norm = Column(String)          # Lookup key, see glossary.normalize_term
+    explanation = Column(Text)
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True)       # uuid4 hex, returned by /upload
+    content_hash = Column(String(64), ForeignKey("document_contents.content_hash"), index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"))  # The upload that started the job
+    file_path = Column(String)                  # Stored upload, removed once ingested
+    stage = Column(String, default="queued")    # queued, extracting, indexing, summarizing, done, failed
+    page_count = Column(Integer, nullable=True)
+    pages_done = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Timeline(Base):
+    """A user's generated "Timeline of Ideas", reused until their library changes."""
+    __tablename__ = "timelines"
+
+    user_id = Column(String, primary_key=True)
+    fingerprint = Column(String(64))   # sha256 of the (doc id, content hash) set it was built from
+    doc_ids = Column(Text)             # JSON list of the document ids already placed on the timeline
+    events = Column(CompressedText)    # JSON array returned by /api/timeline/generate
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChatSession(Base):
+    """A multi-turn conversation, optionally about one document."""
+    __tablename__ = "chat_sessions"
+
+    id = Column(String, primary_key=True)       # uuid4 hex, returned by /api/chat
+    user_id = Column(String, index=True)
+    doc_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    context = Column(CompressedText)            # Paper name + summary, assembled once per session
+    summary = Column(CompressedText)            # Compacted turns older than summarized_until
+    summarized_until = Column(Integer, default=0)  # Last chat_messages.id folded into summary
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (Index("ix_chat_messages_session_id", "session_id", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    role = Column(String)
+    session_id = Column(String, ForeignKey("chat_sessions.id"))
+    doc_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    role = Column(String)       # "user" | "ai"
     content = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
 class Question(Base):
     __tablename__ = "questions"
+    # Keyset pagination of the community feed (newest first)
+    __table_args__ = (Index("ix_questions_timestamp_id", "timestamp", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True)
     title = Column(String)
     content = Column(Text)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    ai_status = Column(String, default="pending", index=True)  # pending -> answered | failed
     
     # Relationship to answers
     answers = relationship("Answer", back_populates="question")
@@ -37,7 +173,7 @@ class Answer(Base):
     __tablename__ = "answers"
 
     id = Column(Integer, primary_key=True, index=True)
-    question_id = Column(Integer, ForeignKey("questions.id")) # Now this will work
+    question_id = Column(Integer, ForeignKey("questions.id"), index=True) # Now this will work
     user_id = Column(String) 
     content = Column(Text)
     is_ai = Column(Integer, default=0) 
@@ -46,6 +182,16 @@ class Answer(Base):
 
     question = relationship("Question", back_populates="answers")
 
+class AnswerVote(Base):
+    """One row per (answer, user): stops the same user voting twice."""
+    __tablename__ = "answer_votes"
+    __table_args__ = (Index("ix_answer_votes_answer_user", "answer_id", "user_id", unique=True),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    answer_id = Column(Integer, ForeignKey("answers.id"))
+    user_id = Column(String)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
 
 class Memory(Base):
     __tablename__ = "memories"
@@ -53,4 +199,68 @@ class Memory(Base):
     user_id = Column(String, index=True)
     content = Column(Text)          # The user's note/insight
     tags = Column(String)           # AI-generated tags (comma-separated)
-    timestamp = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    tag_status = Column(String, default="pending", index=True)  # pending -> tagged | failed
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+class MemoryTag(Base):
+    """Memory.tags split into one normalized (lowercase) row per tag, for filters and facet counts."""
+    __tablename__ = "memory_tags"
+    __table_args__ = (
+        Index("ix_memory_tags_memory_tag", "memory_id", "tag", unique=True),
+        Index("ix_memory_tags_user_tag", "user_id", "tag"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    memory_id = Column(Integer, ForeignKey("memories.id"))
+    user_id = Column(String)    # Copied from the memory so facets never join memories
+    tag = Column(String)
+
+class SearchEntry(Base):
+    """
+    One searchable row per memory or document link, indexed for full-text search:
+    an FTS5 table on SQLite, a GIN tsvector index on Postgres. Kept as plain text
+    (not CompressedText) because the database tokenizes it.
+    """
+    __tablename__ = "search_entries"
+    __table_args__ = (
+        Index("ix_search_entries_ref", "kind", "ref_id", unique=True),
+        Index("ix_search_entries_user_time", "user_id", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String)
+    kind = Column(String)       # "memory" | "document"
+    ref_id = Column(Integer)    # memories.id or documents.id
+    title = Column(Text)        # Document filename
+    body = Column(Text)         # Note content or document summary
+    tags = Column(Text)         # Normalized memory tags, comma-separated
+    timestamp = Column(DateTime, default=datetime.utcnow)
+
+def search_vector(entry=SearchEntry):
+    """Postgres tsvector of an entry; queries must use this exact expression to hit the GIN index."""
+    # Literal constants (not bind parameters) so the expression matches the index definition
+    empty, space = literal_column("''"), literal_column("' '")
+    text = (
+        func.coalesce(entry.title, empty).concat(space)
+        .concat(func.coalesce(entry.body, empty)).concat(space)
+        .concat(func.coalesce(entry.tags, empty))
+    )
+    return func.to_tsvector(literal_column("'english'"), text)
+
+# An expression-only index is not bound to a table automatically
+SearchEntry.__table__.append_constraint(
+    Index("ix_search_entries_fts", search_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+)
+
+# SQLite: external-content FTS5 table over search_entries, kept in sync by triggers
+for statement in (
+    "CREATE VIRTUAL TABLE search_fts USING fts5(title, body, tags, content='search_entries', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER search_entries_ai AFTER INSERT ON search_entries BEGIN "
+    "INSERT INTO search_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, new.tags); END",
+    "CREATE TRIGGER search_entries_ad AFTER DELETE ON search_entries BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body, tags) VALUES ('delete', old.id, old.title, old.body, old.tags); END",
+    "CREATE TRIGGER search_entries_au AFTER UPDATE ON search_entries BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body, tags) VALUES ('delete', old.id, old.title, old.body, old.tags); "
+    "INSERT INTO search_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, new.tags); END",
+):
+    event.listen(SearchEntry.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
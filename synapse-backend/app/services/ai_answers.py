@@ -0,0 +1,65 @@
+import asyncio
+import os
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.models.models import Answer, Question
+from app.services.gemini_service import gemini_ai
+from app.services.job_queue import WorkerPool
+from app.services.social_cache import invalidate_feed, invalidate_question
+
+AI_ANSWER_WORKERS = int(os.getenv("AI_ANSWER_WORKERS", "2"))
+AI_ANSWER_QUEUE_SIZE = int(os.getenv("AI_ANSWER_QUEUE_SIZE", "500"))
+AI_ANSWER_RETRIES = int(os.getenv("AI_ANSWER_RETRIES", "3"))
+
+
+async def answer_question(question_id: int):
+    """
+    Writes the "Synapse AI" answer for a question, retrying with exponential
+    backoff (2s, 4s, ...). The question's ai_status ends as "answered" or "failed".
+    """
+    async with AsyncSessionLocal() as db:
+        q = await db.get(Question, question_id)
+        if not q or q.ai_status != "pending":
+            return
+
+        ai_prompt = f"Answer this academic question concisely: {q.title} - {q.content}"
+        for attempt in range(AI_ANSWER_RETRIES):
+            try:
+                ai_response = await gemini_ai.generate_response(ai_prompt, raise_errors=True)
+                break
+            except Exception as e:
+                print(f"AI Answer Failed (question {question_id}, attempt {attempt + 1}): {e}")
+                if attempt + 1 < AI_ANSWER_RETRIES:
+                    await asyncio.sleep(2 ** (attempt + 1))
+        else:
+            q.ai_status = "failed"
+            await db.commit()
+            invalidate_feed()
+            return
+
+        db.add(Answer(
+            question_id=q.id,
+            user_id="Synapse AI",
+            content=ai_response,
+            is_ai=1,
+            votes=10 # AI starts with some credibility
+        ))
+        q.ai_status = "answered"
+        await db.commit()
+        invalidate_question(q.id)
+
+
+answer_pool = WorkerPool("ai-answer", answer_question, workers=AI_ANSWER_WORKERS, maxsize=AI_ANSWER_QUEUE_SIZE)
+
+
+async def resume_pending_answers():
+    """Re-queues questions whose AI answer was not written before the server stopped."""
+    async with AsyncSessionLocal() as db:
+        pending = await db.scalars(
+            select(Question.id)
+            .where(Question.ai_status == "pending")
+            .order_by(Question.timestamp)
+            .limit(AI_ANSWER_QUEUE_SIZE)
+        )
+        for question_id in pending.all():
+            answer_pool.submit(question_id)
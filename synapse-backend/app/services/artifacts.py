@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.core.database import AsyncSessionLocal
+from app.models.models import Document, DocumentArtifact, DocumentContent, DocumentPage
+from app.services.gemini_service import gemini_ai
+from app.services.glossary import build_glossary
+from app.services.job_queue import QueueFullError, WorkerPool
+from app.services.references import MIN_CONFIDENCE, parse_references
+from app.services.single_flight import SingleFlight
+
+ARTIFACT_WORKERS = int(os.getenv("ARTIFACT_WORKERS", "2"))
+ARTIFACT_QUEUE_SIZE = int(os.getenv("ARTIFACT_QUEUE_SIZE", "200"))
+# Built right after ingest; everything else is built on first request
+EAGER_KINDS = [k for k in os.getenv("ARTIFACTS_EAGER", "graph,quiz,references,glossary").split(",") if k]
+
+CITATION_FORMATS = {"apa": "APA", "mla": "MLA", "chicago": "Chicago", "bibtex": "BibTeX"}
+# Structured extract used by /api/pdf/compare: key -> column heading
+PROFILE_FIELDS = {"methodology": "Methodology", "dataset": "Dataset", "findings": "Core Findings", "weaknesses": "Weaknesses"}
+
+# Concurrent first views of the same document share one build
+_builds = SingleFlight()
+
+
+# --- Prompts (also used by the free-text endpoints) ---
+
+def graph_prompt(summary: str) -> str:
+    return f"""
+    Based on this research summary, create a Knowledge Graph JSON.
+    Identify 5-7 core concepts (nodes) and how they relate (links).
+
+    Summary: "{summary[:1000]}"
+
+    Return ONLY raw JSON in this exact format (no markdown code blocks):
+    {{
+        "nodes": [
+            {{"id": "Main Topic", "group": 1}},
+            {{"id": "Sub Concept A", "group": 2}}
+        ],
+        "links": [
+            {{"source": "Main Topic", "target": "Sub Concept A"}}
+        ]
+    }}
+    """
+
+
+def quiz_prompt(text: str) -> str:
+    return f"""
+    Based on the following research summary, create a quiz with 5 Multiple Choice Questions.
+
+    Summary: "{text[:3000]}"
+
+    Return ONLY a raw JSON array. Do not use Markdown blocks.
+    Format example:
+    [
+        {{
+            "id": 1,
+            "question": "What is the main finding?",
+            "options": ["A", "B", "C", "D"],
+            "answer": "A"
+        }}
+    ]
+    """
+
+
+def citation_prompt(citation_format: str, text_snippet: str, filename: str | None = None) -> str:
+    # Prompt engineering to force the AI to act like a librarian
+    source = f'Filename: "{filename}"\n    ' if filename else ""
+    return f"""
+    Act as a strictly academic librarian.
+    Based on the following text snippet from a research paper, generate a correct {citation_format} citation.
+
+    {source}Context Text: "{text_snippet[:3000]}"
+
+    Rules:
+    1. Extract the title, authors, and year if possible.
+    2. If information is missing, use "n.d." or "Unknown" as per standard rules.
+    3. Return ONLY the citation string. Do not add "Here is the citation".
+    """
+
+
+def references_prompt(raw_text: str) -> str:
+    # We ask Gemini to find the bibliography and map numbers to text
+    return f"""
+    Analyze this research paper text. Locate the "References" or "Bibliography" section.
+    Extract the references and map them to their citation numbers (e.g., [1], [2]).
+
+    Text (last 20000 characters): "{raw_text[-20000:]}"
+
+    Return ONLY a raw JSON object where keys are the numbers and values are the citation text.
+    Example:
+    {{
+        "1": "Smith, J. (2020). AI Trends.",
+        "2": "Doe, A. (2021). Future of Code."
+    }}
+    If no numbered references are found, return {{}}.
+    """
+
+
+def profile_prompt(summary: str) -> str:
+    return f"""
+    Read this research paper summary and extract its key facts for a literature review table.
+
+    Summary: "{summary[:3000]}"
+
+    Return ONLY a raw JSON object with exactly these keys, each a short phrase (max 25 words):
+    {{
+        "methodology": "How the study was done",
+        "dataset": "Data or subjects used (\"Not stated\" if unknown)",
+        "findings": "Core findings",
+        "weaknesses": "Limitations or weaknesses"
+    }}
+    """
+
+
+# --- Response shapes (validated by gemini_ai.generate_json) ---
+
+class GraphNode(BaseModel):
+    id: str
+    group: int = 1
+
+
+class GraphLink(BaseModel):
+    source: str
+    target: str
+
+
+class GraphData(BaseModel):
+    nodes: list[GraphNode]
+    links: list[GraphLink] = []
+
+
+class QuizQuestion(BaseModel):
+    id: int
+    question: str
+    options: list[str]
+    answer: str
+
+
+class PaperProfile(BaseModel):
+    methodology: str = "Not stated"
+    dataset: str = "Not stated"
+    findings: str = "Not stated"
+    weaknesses: str = "Not stated"
+
+# Citation number -> citation text
+References = dict[str, str]
+
+
+# --- Builders: (db, content, variant) -> JSON-serializable data ---
+
+async def build_graph(db, content: DocumentContent, variant: str):
+    return await gemini_ai.generate_json(graph_prompt(content.summary or ""), GraphData)
+
+
+async def build_quiz(db, content: DocumentContent, variant: str):
+    return await gemini_ai.generate_json(quiz_prompt(content.summary or ""), list[QuizQuestion])
+
+
+async def build_citation(db, content: DocumentContent, variant: str):
+    if variant not in CITATION_FORMATS:
+        raise HTTPException(status_code=400, detail="Unknown citation format")
+    # The title page names the paper and its authors; uploaders' filenames vary
+    first_page = await db.scalar(
+        select(DocumentPage.content)
+        .where(DocumentPage.content_hash == content.content_hash, DocumentPage.page_number == 1)
+    )
+    prompt = citation_prompt(CITATION_FORMATS[variant], first_page or content.summary or "")
+    citation = await gemini_ai.generate_response(prompt, raise_errors=True)
+    return {"citation": citation.replace("```", "").strip()}
+
+
+async def build_references(db, content: DocumentContent, variant: str):
+    raw_text = await db.scalar(
+        select(DocumentContent.raw_text).where(DocumentContent.content_hash == content.content_hash)
+    ) or ""
+
+    # Regular "[n]" / "n." bibliographies are split locally; only unclear ones cost an AI call
+    refs, confidence = parse_references(raw_text)
+    if confidence >= MIN_CONFIDENCE:
+        return refs
+
+    return await gemini_ai.generate_json(references_prompt(raw_text), References)
+
+
+async def build_profile(db, content: DocumentContent, variant: str):
+    profile = await gemini_ai.generate_json(profile_prompt(content.summary or ""), PaperProfile)
+    return {key: profile[key].strip() or "Not stated" for key in PROFILE_FIELDS}
+
+
+# kind -> (prompt version, builder). Bump the version when a prompt changes.
+ARTIFACT_KINDS = {
+    "graph": (1, build_graph),
+    "quiz": (1, build_quiz),
+    "citation": (1, build_citation),
+    "references": (1, build_references),
+    "profile": (1, build_profile),
+    "glossary": (1, build_glossary),      # Rows live in glossary_terms; the artifact lists the terms
+}
+
+
+async def get_artifact(db, content_hash: str, kind: str):
+    """Returns the stored artifact, building and storing it on first request."""
+    name, _, variant = kind.partition(":")
+    version, _ = ARTIFACT_KINDS[name]
+
+    data = await db.scalar(
+        select(DocumentArtifact.data).where(
+            DocumentArtifact.content_hash == content_hash,
+            DocumentArtifact.kind == kind,
+            DocumentArtifact.prompt_version == version,
+        )
+    )
+    if data is not None:
+        return json.loads(data)
+    return await _builds.do(f"{content_hash}:{kind}:{version}", lambda: build_artifact(content_hash, kind))
+
+
+async def get_artifacts(db, content_hashes: list[str], kind: str) -> dict:
+    """get_artifact for many contents: one query for the stored ones, missing ones built concurrently."""
+    name, _, _ = kind.partition(":")
+    version, _ = ARTIFACT_KINDS[name]
+
+    rows = await db.execute(
+        select(DocumentArtifact.content_hash, DocumentArtifact.data).where(
+            DocumentArtifact.content_hash.in_(content_hashes),
+            DocumentArtifact.kind == kind,
+            DocumentArtifact.prompt_version == version,
+        )
+    )
+    found = {h: json.loads(data) for h, data in rows.all()}
+
+    missing = [h for h in dict.fromkeys(content_hashes) if h not in found]
+    built = await asyncio.gather(*[
+        _builds.do(f"{h}:{kind}:{version}", lambda h=h: build_artifact(h, kind)) for h in missing
+    ])
+    found.update(zip(missing, built))
+    return found
+
+
+async def build_artifact(content_hash: str, kind: str):
+    name, _, variant = kind.partition(":")
+    version, build = ARTIFACT_KINDS[name]
+
+    # Own session: the build outlives the request that started it if that client goes away
+    async with AsyncSessionLocal() as db:
+        content = await db.get(DocumentContent, content_hash)
+        result = await build(db, content, variant)
+        db.add(DocumentArtifact(
+            content_hash=content_hash, kind=kind, prompt_version=version, data=json.dumps(result)
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()  # Built concurrently by another process
+        return result
+
+
+async def document_artifact(db, doc: Document, kind: str):
+    """Artifact for a document endpoint: 409 while it is still ingesting, 500 if the build fails."""
+    if doc.status != "ready":
+        raise HTTPException(status_code=409, detail="Document is still processing")
+    try:
+        return await get_artifact(db, doc.content_hash, kind)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Artifact Error ({kind}, doc {doc.id}): {e}")
+        raise HTTPException(status_code=500, detail=f"Could not generate {kind.split(':')[0]}")
+
+
+async def precompute_artifacts(content_hash: str):
+    """Builds the EAGER_KINDS for a freshly ingested document, so opening it costs no AI call."""
+    async with AsyncSessionLocal() as db:
+        for kind in EAGER_KINDS:
+            try:
+                await get_artifact(db, content_hash, kind)
+            except Exception as e:
+                # Not fatal: the kind is built again on first request
+                print(f"Artifact Error ({kind}, {content_hash[:12]}): {e}")
+
+
+artifact_pool = WorkerPool("artifacts", precompute_artifacts, workers=ARTIFACT_WORKERS, maxsize=ARTIFACT_QUEUE_SIZE)
+
+
+def queue_artifacts(content_hash: str):
+    if not EAGER_KINDS:
+        return
+    try:
+        artifact_pool.submit(content_hash)
+    except QueueFullError:
+        print(f"Artifact queue full, {content_hash[:12]} is built on first view")
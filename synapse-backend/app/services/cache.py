@@ -0,0 +1,217 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small in-memory LRU with per-entry TTL (None: no expiry, <= 0: not stored).
+    Safe to share between the event loop and worker threads.
+    """
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float | None = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (expires_at | None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            self.pop(key)  # Already expired: an older value must not be served either
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Indentation inside the f-string prompts changes between edits, not the meaning
+    return " ".join(prompt.split())
+
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+TRIM_EVERY = 500  # Disk writes between expiry/size trims
+
+
+class PromptCache:
+    """
+    Two-tier cache for LLM responses.
+    1. Memory: LRU bounded by LLM_CACHE_MAX_ENTRIES.
+    2. Disk: SQLite file at LLM_CACHE_PATH, so restarts start warm. Expired rows
+       are removed when read and on periodic trims, which also cap the file at
+       LLM_CACHE_MAX_DISK_ROWS entries.
+    Each entry remembers how long the original call took, which feeds the
+    "latency saved" counter on every hit.
+    """
+
+    def __init__(self, path: str | None = None, max_entries: int | None = None):
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+        self.path = path or os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+        self.memory = LRUCache(max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048")))
+        self.max_disk_rows = int(os.getenv("LLM_CACHE_MAX_DISK_ROWS", "50000"))
+        self._writes_since_trim = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "saved_seconds": 0.0,
+        }
+
+    def _db(self):
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    latency REAL NOT NULL DEFAULT 0,
+                    expires_at REAL
+                )
+                """
+            )
+        return self._conn
+
+    async def get(self, key: str):
+        if not self.enabled:
+            return None
+
+        # 1. Memory tier
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, latency = entry
+            self.stats["memory_hits"] += 1
+            self.stats["saved_seconds"] += latency
+            return value
+
+        # 2. Disk tier (SQLite is blocking: off the event loop)
+        row = await asyncio.to_thread(self._read, key)
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+
+        value, latency, expires_at = row
+        # Promote to memory for the remaining lifetime of the entry
+        self.memory.set(key, (value, latency), ttl=(expires_at - time.time()) if expires_at else None)
+        self.stats["disk_hits"] += 1
+        self.stats["saved_seconds"] += latency
+        return value
+
+    async def set(self, key: str, value: str, ttl: float | None, latency: float = 0.0):
+        if not self.enabled:
+            return
+        if ttl is not None and ttl <= 0:
+            return  # Same rule as LRUCache: a zero TTL means do not cache
+        self.memory.set(key, (value, latency), ttl=ttl)
+        expires_at = time.time() + ttl if ttl is not None else None
+        if await asyncio.to_thread(self._write, key, value, latency, expires_at):
+            self.stats["writes"] += 1
+
+    def _read(self, key: str):
+        """Live disk row for `key`; an expired row is deleted when found."""
+        try:
+            with self._lock:
+                conn = self._db()
+                row = conn.execute(
+                    "SELECT value, latency, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[2] is not None and row[2] < time.time():
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                return row
+        except sqlite3.Error as e:
+            print(f"LLM Cache Error: {e}")
+            return None
+
+    def _write(self, key: str, value: str, latency: float, expires_at: float | None) -> bool:
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, latency, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, value, latency, expires_at),
+                )
+                conn.commit()
+                self._writes_since_trim += 1
+                if self._writes_since_trim >= TRIM_EVERY:
+                    self._trim(conn)
+            return True
+        except sqlite3.Error as e:
+            print(f"LLM Cache Error: {e}")
+            return False
+
+    def _trim(self, conn):
+        # Caller holds the lock. INSERT OR REPLACE gives a row a new rowid, so rowid order
+        # is write order and the oldest writes go first once the file is over its cap.
+        conn.execute("DELETE FROM llm_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM llm_cache WHERE rowid IN "
+            "(SELECT rowid FROM llm_cache ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_rows,),
+        )
+        conn.commit()
+        self._writes_since_trim = 0
+
+    def purge_expired(self):
+        """Drops expired rows and trims the disk tier to LLM_CACHE_MAX_DISK_ROWS (run at startup)."""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                self._trim(self._db())
+        except sqlite3.Error as e:
+            print(f"LLM Cache Error: {e}")
+
+    def snapshot(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "saved_seconds": round(self.stats["saved_seconds"], 3),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "enabled": self.enabled,
+        }
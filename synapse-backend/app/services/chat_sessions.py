@@ -0,0 +1,126 @@
+import os
+import uuid
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from app.core.database import AsyncSessionLocal
+from app.models.models import ChatMessage, ChatSession
+from app.services.documents import get_document
+from app.services.gemini_service import gemini_ai
+from app.services.job_queue import QueueFullError, WorkerPool
+from app.services.retrieval import CHARS_PER_TOKEN
+
+HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))      # Recent turns sent verbatim
+KEEP_RECENT = int(os.getenv("CHAT_KEEP_RECENT_MESSAGES", "4"))      # Never folded into the summary
+SESSION_PASSAGE_TOKENS = int(os.getenv("CHAT_SESSION_PASSAGE_TOKENS", "3000"))
+WINDOW_MAX_MESSAGES = 50
+SUMMARY_WORDS = 200
+
+
+async def get_or_create_session(db, session_id: str | None, user_id: str | None, doc_id: int | None) -> ChatSession:
+    """Loads a session, or starts one (with its document context assembled once)."""
+    if session_id:
+        session = await db.get(ChatSession, session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        return session
+
+    context = None
+    if doc_id:
+        doc = await get_document(db, doc_id)
+        context = f"Paper: {doc.filename}\nSummary: {doc.summary}"
+    session = ChatSession(id=uuid.uuid4().hex, user_id=user_id, doc_id=doc_id, context=context)
+    db.add(session)
+    await db.commit()
+    return session
+
+
+async def unsummarized(db, session: ChatSession, newest_first: bool = False, limit: int | None = None):
+    q = select(ChatMessage).where(
+        ChatMessage.session_id == session.id, ChatMessage.id > (session.summarized_until or 0)
+    )
+    q = q.order_by(ChatMessage.id.desc() if newest_first else ChatMessage.id)
+    if limit:
+        q = q.limit(limit)
+    return (await db.scalars(q)).all()
+
+
+def format_turns(turns) -> str:
+    """`turns` are ChatMessages or (role, content) pairs."""
+    pairs = [(t.role, t.content) if isinstance(t, ChatMessage) else t for t in turns]
+    return "\n".join(f"{'User' if role == 'user' else 'Assistant'}: {content}" for role, content in pairs)
+
+
+async def history_prompt(db, session: ChatSession) -> str:
+    """Summary of older turns plus the newest turns that fit HISTORY_TOKENS."""
+    budget = HISTORY_TOKENS * CHARS_PER_TOKEN
+    window = []
+    for m in await unsummarized(db, session, newest_first=True, limit=WINDOW_MAX_MESSAGES):
+        if budget <= 0:
+            break
+        # A single oversized message keeps its end (the part closest to the next turn)
+        content = m.content if len(m.content) <= budget else "…" + m.content[-budget:]
+        window.append((m.role, content))
+        budget -= len(content)
+    window.reverse()
+
+    parts = []
+    if session.summary:
+        parts.append(f"Summary of the earlier conversation: {session.summary}")
+    if window:
+        parts.append(format_turns(window))
+    return "\n".join(parts)
+
+
+async def record_turn(session_id: str, doc_id: int | None, question: str, answer: str):
+    """Stores one question/answer pair and queues compaction once the history outgrows its budget."""
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            ChatMessage(session_id=session_id, doc_id=doc_id, role="user", content=question),
+            ChatMessage(session_id=session_id, doc_id=doc_id, role="ai", content=answer),
+        ])
+        session = await db.get(ChatSession, session_id)
+        session.updated_at = datetime.utcnow()
+        await db.commit()
+
+        pending_chars = await db.scalar(
+            select(func.sum(func.length(ChatMessage.content)))
+            .where(ChatMessage.session_id == session_id, ChatMessage.id > (session.summarized_until or 0))
+        )
+    if (pending_chars or 0) > HISTORY_TOKENS * CHARS_PER_TOKEN:
+        try:
+            compact_pool.submit(session_id)
+        except QueueFullError:
+            pass  # Retried after the next turn
+
+
+async def compact_session(session_id: str):
+    """Folds all but the newest KEEP_RECENT messages into the session's running summary."""
+    async with AsyncSessionLocal() as db:
+        session = await db.get(ChatSession, session_id)
+        if not session:
+            return
+        messages = await unsummarized(db, session)
+        if len(messages) <= KEEP_RECENT:
+            return
+        older = messages[:-KEEP_RECENT] if KEEP_RECENT else messages
+
+        prompt = f"""
+        Summarize this conversation between a user and a research assistant in at most {SUMMARY_WORDS} words.
+        Keep facts, names, numbers, the user's goals and any open questions; drop pleasantries.
+
+        Earlier summary: {session.summary or "(none)"}
+
+        New turns:
+        {format_turns(older)}
+        """
+        try:
+            session.summary = (await gemini_ai.generate_response(prompt, raise_errors=True)).strip()
+        except Exception as e:
+            print(f"Chat Compaction Error ({session_id}): {e}")
+            return
+        session.summarized_until = older[-1].id
+        await db.commit()
+
+
+compact_pool = WorkerPool("chat-compact", compact_session, workers=1, maxsize=200)
@@ -0,0 +1,69 @@
+import os
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.models.models import Document, DocumentComparison
+from app.services.artifacts import ARTIFACT_KINDS, PROFILE_FIELDS, get_artifacts
+from app.services.documents import fingerprint
+
+MAX_COMPARE_DOCS = int(os.getenv("MAX_COMPARE_DOCS", "10"))
+
+
+def cell(value: str) -> str:
+    return " ".join(str(value).split()).replace("|", "\\|")
+
+
+def comparison_table(docs, profiles: dict) -> str:
+    """Markdown table, one row per paper, one column per PROFILE_FIELDS entry."""
+    lines = [
+        "| Paper | " + " | ".join(PROFILE_FIELDS.values()) + " |",
+        "|---" * (len(PROFILE_FIELDS) + 1) + "|",
+    ]
+    for doc in docs:
+        profile = profiles[doc.content_hash]
+        lines.append(f"| {cell(doc.filename)} | " + " | ".join(cell(profile[k]) for k in PROFILE_FIELDS) + " |")
+    return "\n".join(lines)
+
+
+async def compare_documents(db, doc_ids: list[int]) -> dict:
+    """
+    Compares 2..MAX_COMPARE_DOCS documents. Each paper is profiled once (shared
+    "profile" artifact); the table is assembled locally and stored per id set.
+    """
+    ids = sorted(set(doc_ids))
+    if not 2 <= len(ids) <= MAX_COMPARE_DOCS:
+        raise HTTPException(status_code=400, detail=f"Select between 2 and {MAX_COMPARE_DOCS} documents")
+
+    # 1. All documents in one query
+    docs = (await db.scalars(select(Document).where(Document.id.in_(ids)).order_by(Document.id))).all()
+    if len(docs) != len(ids):
+        raise HTTPException(status_code=404, detail="Docs not found")
+    if any(d.status != "ready" for d in docs):
+        raise HTTPException(status_code=409, detail="Document is still processing")
+
+    # 2. Stored table for this exact set
+    key = ",".join(map(str, ids))
+    version, _ = ARTIFACT_KINDS["profile"]
+    current = fingerprint(docs)
+    stored = await db.get(DocumentComparison, key)
+    if stored and stored.fingerprint == current and stored.prompt_version == version:
+        return {"doc_ids": ids, "comparison": stored.comparison}
+
+    # 3. Per-paper profiles (only papers never profiled before cost an AI call)
+    try:
+        profiles = await get_artifacts(db, [d.content_hash for d in docs], "profile")
+    except Exception as e:
+        print(f"Compare Error ({key}): {e}")
+        raise HTTPException(status_code=500, detail="Could not compare documents")
+
+    # 4. Assemble and store
+    comparison = comparison_table(docs, profiles)
+    if stored:
+        stored.fingerprint, stored.prompt_version, stored.comparison = current, version, comparison
+    else:
+        db.add(DocumentComparison(doc_ids=key, fingerprint=current, prompt_version=version, comparison=comparison))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()  # Same set compared concurrently
+    return {"doc_ids": ids, "comparison": comparison}
@@ -0,0 +1,26 @@
+import hashlib
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Document, DocumentContent
+
+
+async def get_document(db: AsyncSession, doc_id: int) -> Document:
+    """Loads a document (with its summary, not its raw text) or raises 404."""
+    doc = await db.get(Document, doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return doc
+
+
+async def load_raw_text(db: AsyncSession, content_hash: str) -> str:
+    """Fetches (and decompresses) the full text of a document content."""
+    return await db.scalar(
+        select(DocumentContent.raw_text).where(DocumentContent.content_hash == content_hash)
+    ) or ""
+
+
+def fingerprint(rows) -> str:
+    """sha256 of a set of (doc id, content hash) rows: changes when a document is added, removed or replaced."""
+    key = "\n".join(f"{r.id}:{r.content_hash}" for r in sorted(rows, key=lambda r: r.id))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
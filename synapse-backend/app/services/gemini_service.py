@@ -1,33 +1,226 @@
 import google.generativeai as genai
+import asyncio
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from pydantic import TypeAdapter
+from app.services.cache import PromptCache, prompt_key
+from app.services.single_flight import SingleFlight
+from app.services.structured_output import gemini_schema, parse_structured, reask_prompt
 
 # 1. Load environment variables
 load_dotenv()
 
+
+class GeminiBusyError(Exception):
+    """Raised when too many calls are already waiting for a free Gemini slot."""
+
+
 class GeminiService:
     def __init__(self):
         # Get the API Key from .env
         self.api_key = os.getenv("GEMINI_API_KEY")
-        
+
         if not self.api_key:
             print("⚠️ WARNING: GEMINI_API_KEY not found in .env file.")
-        
+
         # Configure Gemini
         genai.configure(api_key=self.api_key)
-        
+
         # Use 'gemini-1.5-flash' (It is fast and free-tier friendly)
-        self.model = genai.GenerativeModel('gemini-2.5-flash-lite')
+        self.model_name = 'gemini-2.5-flash-lite'
+        self.model = genai.GenerativeModel(self.model_name)
+
+        # 2. Concurrency limits
+        # The SDK call is blocking, so it runs in a dedicated thread pool instead of on
+        # the event loop. At most `max_concurrency` calls are in flight, at most
+        # `max_queue` more may wait for a slot, and each call gives up after `timeout` seconds.
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        self.max_queue = int(os.getenv("GEMINI_MAX_QUEUE", "64"))
+        self.timeout = float(os.getenv("GEMINI_TIMEOUT", "60"))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="gemini")
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+
+        # 3. Response cache (opt-in per call, see generate_response)
+        self.cache = PromptCache()
+        self.default_cache_ttl = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+
+        # 4. Identical prompts that are already in flight share one upstream call
+        self._inflight = SingleFlight()
+
+        # 5. How structured (JSON) answers were obtained, see generate_json
+        self.json_stats = {"valid": 0, "repaired": 0, "reasked": 0, "failed": 0}
+
+    async def _submit(self, fn, *args):
+        """
+        Waits for a free slot and starts a blocking SDK call in the Gemini thread pool.
+        The slot is held until the worker thread really finishes, so a timed-out
+        or abandoned call still counts against the in-flight cap while it drains.
+        """
+        if self._waiting >= self.max_queue:
+            raise GeminiBusyError("Too many AI requests are queued. Please retry shortly.")
+
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: _call_soon(loop, self._slots.release))
+        return future
+
+    async def _run_blocking(self, fn, *args, timeout: float | None = None):
+        future = await self._submit(fn, *args)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Gemini did not answer within {timeout or self.timeout:.0f}s")
+
+    def _generate_sync(self, prompt: str, generation_config: dict | None = None):
+        response = self.model.generate_content(
+            prompt, generation_config=generation_config, request_options={"timeout": self.timeout}
+        )
+        return response.text
+
+    async def stream_response(self, prompt: str, timeout: float | None = None):
+        """
+        Yields the answer text chunk by chunk as Gemini produces it.
+        `timeout` bounds the wait for each chunk. Closing the generator (for example
+        when the client disconnects) stops the worker from reading further chunks.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
 
-    async def generate_response(self, prompt: str):
+        def produce():
+            try:
+                response = self.model.generate_content(prompt, stream=True, request_options={"timeout": self.timeout})
+                for chunk in response:
+                    if stop.is_set():
+                        break
+                    if chunk.parts:
+                        _call_soon(loop, chunks.put_nowait, chunk.text)
+                _call_soon(loop, chunks.put_nowait, done)
+            except Exception as e:
+                _call_soon(loop, chunks.put_nowait, e)
+
+        await self._submit(produce)
+        try:
+            while True:
+                item = await asyncio.wait_for(chunks.get(), timeout or self.timeout)
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    async def _fetch(self, prompt: str, key: str | None, ttl: float | None, timeout: float | None):
+        started = time.perf_counter()
+        text = await self._run_blocking(self._generate_sync, prompt, timeout=timeout)
+        if key:
+            await self.cache.set(key, text, ttl=self.default_cache_ttl if ttl is None else ttl, latency=time.perf_counter() - started)
+        return text
+
+    async def generate_response(self, prompt: str, timeout: float | None = None, cache: bool = False, ttl: float | None = None, coalesce: bool = True, raise_errors: bool = False):
         """
         Sends a text prompt to Gemini and returns the text response.
+        Pass cache=True to serve repeats of the same prompt from the response cache
+        for `ttl` seconds (LLM_CACHE_TTL by default). Concurrent calls with the same
+        prompt share one upstream request unless coalesce=False. Errors are never cached;
+        they come back as an "AI Error: ..." string, or are raised with raise_errors=True.
         """
+        key = prompt_key(self.model_name, prompt)
+        if cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            if coalesce:
+                return await self._inflight.do(key, lambda: self._fetch(prompt, key if cache else None, ttl, timeout))
+            return await self._fetch(prompt, key if cache else None, ttl, timeout)
         except Exception as e:
+            if raise_errors:
+                raise
             return f"AI Error: {str(e)}"
 
+    async def _fetch_json(self, prompt: str, adapter: TypeAdapter, schema: dict | None, key: str | None, ttl: float | None, timeout: float | None):
+        config = {"response_mime_type": "application/json"}
+        if schema:
+            config["response_schema"] = schema
+
+        started = time.perf_counter()
+        response = await self._run_blocking(self._generate_sync, prompt, config, timeout=timeout)
+        try:
+            data, repaired = parse_structured(response, adapter)
+            self.json_stats["repaired" if repaired else "valid"] += 1
+        except ValueError as e:
+            # One targeted re-ask with the broken output, never the (long) original prompt
+            self.json_stats["reasked"] += 1
+            response = await self._run_blocking(self._generate_sync, reask_prompt(response, e, schema), config, timeout=timeout)
+            try:
+                data, _ = parse_structured(response, adapter)
+            except ValueError:
+                self.json_stats["failed"] += 1
+                raise
+
+        text = json.dumps(data)
+        if key:
+            await self.cache.set(key, text, ttl=self.default_cache_ttl if ttl is None else ttl, latency=time.perf_counter() - started)
+        return text
+
+    async def generate_json(self, prompt: str, model, timeout: float | None = None, cache: bool = False, ttl: float | None = None):
+        """
+        Asks Gemini for JSON matching `model` (a pydantic model or type such as
+        list[Model] or dict[str, str]) and returns it validated, as plain JSON data.
+        Uses JSON mode with a response schema where Gemini can express one, repairs
+        near-valid output locally and re-asks at most once. Only valid results are
+        cached; anything else raises (ValueError if the output never validated).
+        """
+        adapter = TypeAdapter(model)
+        # The schema is part of the key: the same prompt asked for two different models must
+        # neither coalesce nor share a cache entry. repr gives the qualified name of a class
+        # and keeps the parameters of list[...] / dict[...] (whose __qualname__ is just "dict")
+        key = prompt_key(self.model_name, f"{prompt}\x00json\x00{model!r}")
+        if cache:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
+
+        schema = gemini_schema(model)
+        text = await self._inflight.do(key, lambda: self._fetch_json(prompt, adapter, schema, key if cache else None, ttl, timeout))
+        return json.loads(text)  # A fresh copy per caller, even for coalesced calls
+
+    def stats(self):
+        return {
+            "cache": self.cache.snapshot(),
+            "coalescing": {**self._inflight.stats, "inflight": len(self._inflight)},
+            "waiting_for_slot": self._waiting,
+            "json": dict(self.json_stats),
+        }
+
+def _call_soon(loop, fn, *args):
+    # Worker threads may outlive the loop during shutdown
+    try:
+        loop.call_soon_threadsafe(fn, *args)
+    except RuntimeError:
+        pass
+
 # Create a single instance to import elsewhere
 gemini_ai = GeminiService()
\ No newline at end of file
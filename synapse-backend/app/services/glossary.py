@@ -0,0 +1,186 @@
+import asyncio
+import os
+import re
+from collections import Counter
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.database import async_engine
+from app.models.models import DocumentContent, GlossaryTerm
+from app.services.cache import LRUCache
+from app.services.documents import load_raw_text
+from app.services.gemini_service import gemini_ai
+
+GLOSSARY_MAX_TERMS = int(os.getenv("GLOSSARY_MAX_TERMS", "60"))
+GLOSSARY_BATCH = int(os.getenv("GLOSSARY_BATCH", "20"))   # Terms explained per Gemini call
+CONTEXT_CHARS = 120
+
+# (content_hash, term_norm) -> explanation; terms never change once explained
+term_cache = LRUCache(max_entries=20000)
+
+STOPWORDS = set("""
+a about above after again against all also although among an and any are as at be because been before being
+below between both but by can could did do does doing down during each either et al etc few for from further
+had has have having here how however i if in into is it its itself just may might more most much must no nor
+not of off on once only or other our out over own same several should since so some such than that the their
+them then there these they this those through thus to too under until up upon us using very via was we were
+what when where whether which while who whom why will with within without would yet
+fig figure figures table tables section sections paper papers result results method methods approach work
+study studies proposed propose show shows shown use used based first second third new one two three
+""".split())
+
+ACRONYM = re.compile(r"\b[A-Z][A-Za-z]*[A-Z][A-Za-z0-9]*s?\b")   # CNN, BERT, LoRA, GPUs
+HYPHENATED = re.compile(r"\b[a-z][a-z0-9]+(?:-[a-z0-9]+)+\b")    # self-attention, state-of-the-art
+WORD = re.compile(r"[A-Za-z][A-Za-z0-9]*(?:-[A-Za-z0-9]+)*")
+CLAUSE_BREAK = re.compile(r"[.,;:!?()\[\]{}\"]|\s-\s")                # Phrases never span these
+
+
+def normalize_term(term: str) -> str:
+    """Lookup key: lowercase, single spaces, no surrounding punctuation, singular-ish."""
+    norm = " ".join(term.lower().split()).strip(" .,;:()[]\"'")
+    if len(norm) > 3 and norm.endswith("s") and not norm.endswith("ss"):
+        norm = norm[:-1]
+    return norm
+
+
+def extract_terms(text: str, limit: int = GLOSSARY_MAX_TERMS) -> list[str]:
+    """
+    Candidate technical terms, most frequent first: acronyms, hyphenated compounds
+    and repeated 2-3 word phrases without stopwords. Purely local (no AI call).
+    """
+    scores: Counter = Counter()
+    surface: dict[str, str] = {}
+
+    def add(term: str, weight: float):
+        norm = normalize_term(term)
+        if len(norm) < 2 or norm in STOPWORDS:
+            return
+        scores[norm] += weight
+        surface.setdefault(norm, term)
+
+    acronyms = Counter(m.group(0) for m in ACRONYM.finditer(text))
+    for term, count in acronyms.items():
+        # Mixed case (LoRA) is distinctive; all caps (CNN, but also RESULTS) needs more evidence
+        if (count >= 2 and len(term) <= 12 and not term.isupper()) or (count >= 3 and len(term) <= 8):
+            add(term, count * 1.5)
+
+    for term, count in Counter(m.group(0) for m in HYPHENATED.finditer(text.lower())).items():
+        if count >= 2:
+            add(term, count * 1.2)
+
+    phrases = Counter()
+    for clause in CLAUSE_BREAK.split(text.lower()):
+        words = WORD.findall(clause)
+        for n in (2, 3):
+            for i in range(len(words) - n + 1):
+                gram = words[i:i + n]
+                if any(w in STOPWORDS or len(w) < 3 for w in gram):
+                    continue
+                phrases[" ".join(gram)] += 1
+    for phrase, count in phrases.items():
+        if count >= 3:
+            add(phrase, count * len(phrase.split()) / 2)
+
+    # Drop phrases that only occur as part of a longer, equally frequent phrase
+    ranked = [norm for norm, _ in scores.most_common()]
+    kept = []
+    for norm in ranked:
+        if any(norm in longer and phrases.get(longer, 0) >= phrases.get(norm, 0) > 0 for longer in kept):
+            continue
+        kept.append(norm)
+        if len(kept) >= limit:
+            break
+    return [surface[norm] for norm in kept]
+
+
+def terms_with_context(text: str) -> tuple[list[str], list[str]]:
+    """extract_terms plus the text around each term's first occurrence."""
+    terms = extract_terms(text)
+    lowered = text.lower()
+    contexts = []
+    for term in terms:
+        i = lowered.find(term.lower())
+        contexts.append("" if i < 0 else " ".join(text[max(0, i - CONTEXT_CHARS):i + len(term) + CONTEXT_CHARS].split()))
+    return terms, contexts
+
+
+def explain_prompt(terms: list[str], contexts: list[str]) -> str:
+    listed = "\n".join(f'- "{t}" (context: "{c}")' if c else f'- "{t}"' for t, c in zip(terms, contexts))
+    return f"""
+    Explain each of these terms from a research paper simply (like I am 5 years old).
+    Keep every answer extremely concise (max 2 sentences).
+
+    Terms:
+    {listed}
+
+    Return ONLY a raw JSON object mapping each term exactly as written to its explanation.
+    """
+
+
+async def explain_terms(terms: list[str], contexts: list[str] | None = None) -> dict[str, str]:
+    """Explains many terms in batched Gemini calls. Returns normalized term -> explanation."""
+    contexts = contexts or [""] * len(terms)
+    explained = {}
+    for start in range(0, len(terms), GLOSSARY_BATCH):
+        batch = terms[start:start + GLOSSARY_BATCH]
+        data = await gemini_ai.generate_json(explain_prompt(batch, contexts[start:start + GLOSSARY_BATCH]), dict[str, str])
+        for term, explanation in data.items():
+            if explanation.strip():
+                explained[normalize_term(term)] = explanation.strip()
+    return explained
+
+
+async def build_glossary(db, content: DocumentContent, variant: str):
+    """Artifact builder: extracts terms locally, explains them in batches, fills glossary_terms."""
+    raw_text = await load_raw_text(db, content.content_hash)
+    # CPU-bound on long papers: keep it off the event loop
+    terms, contexts = await asyncio.to_thread(terms_with_context, raw_text)
+    explained = await explain_terms(terms, contexts)
+
+    surface = {}
+    for term in terms:
+        norm = normalize_term(term)
+        if norm in explained:
+            surface.setdefault(norm, term)
+    await store_terms(db, content.content_hash, {norm: explained[norm] for norm in surface}, surface)
+    return {"terms": list(surface.values())}
+
+
+async def lookup_terms(db, content_hash: str, terms: list[str]) -> dict[str, str]:
+    """Stored explanations for `terms` (keyed by the term as given); memory cache, then one IN query."""
+    found, missing = {}, {}
+    for term in terms:
+        norm = normalize_term(term)
+        cached = term_cache.get((content_hash, norm))
+        if cached is not None:
+            found[term] = cached
+        else:
+            missing.setdefault(norm, []).append(term)
+
+    if missing:
+        rows = await db.execute(
+            select(GlossaryTerm.term_norm, GlossaryTerm.explanation)
+            .where(GlossaryTerm.content_hash == content_hash, GlossaryTerm.term_norm.in_(list(missing)))
+        )
+        for norm, explanation in rows.all():
+            term_cache.set((content_hash, norm), explanation)
+            for term in missing[norm]:
+                found[term] = explanation
+    return found
+
+
+async def store_terms(db, content_hash: str, explained: dict[str, str], surface: dict[str, str]):
+    """
+    Adds explanations so the next lookup is a hit. Caller commits. Terms another
+    request stored first (same term explained concurrently) keep that explanation.
+    """
+    if not explained:
+        return
+    dialect = postgresql if async_engine.dialect.name == "postgresql" else sqlite
+    await db.execute(
+        dialect.insert(GlossaryTerm)
+        .values([
+            {"content_hash": content_hash, "term": surface.get(norm, norm), "term_norm": norm, "explanation": explanation}
+            for norm, explanation in explained.items()
+        ])
+        .on_conflict_do_nothing(index_elements=["content_hash", "term_norm"])
+    )
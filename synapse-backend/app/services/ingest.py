@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from sqlalchemy import delete, select, update
+from app.core.database import AsyncSessionLocal
+from app.models.models import (
+    Document, DocumentArtifact, DocumentChunk, DocumentContent, DocumentPage, GlossaryTerm, IngestJob,
+)
+from app.services.artifacts import queue_artifacts
+from app.services.gemini_service import gemini_ai
+from app.services.job_queue import WorkerPool
+from app.services.pdf_extract import iter_page_batches
+from app.services.related import term_vector
+from app.services.retrieval import index_document
+from app.services.search import index_documents
+
+LEGACY_PAGES = 10   # Pages the text was cut to before deduplication (see migrate_db step 3)
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "100"))
+
+
+def content_hash(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest()
+
+
+def save_upload(contents: bytes) -> str:
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.pdf")
+    with open(path, "wb") as f:
+        f.write(contents)
+    return path
+
+
+async def extract_pages(db, job: IngestJob) -> dict[int, str]:
+    """
+    Extracts all pages in the process pool, storing each range of pages as soon
+    as it arrives. Returns page number -> text.
+    """
+    await db.execute(delete(DocumentPage).where(DocumentPage.content_hash == job.content_hash))
+    job.pages_done = 0
+    await db.commit()
+    pages = {}
+
+    async for page_count, batch in iter_page_batches(job.file_path):
+        job.page_count = page_count
+        for page_number, text, error in batch:
+            pages[page_number] = text
+            db.add(DocumentPage(content_hash=job.content_hash, page_number=page_number, content=text, error=error))
+        job.pages_done += len(batch)
+        await db.commit()
+
+    return pages
+
+
+def make_preview(summary: str | None, length: int = 280) -> str | None:
+    if not summary:
+        return summary
+    flat = " ".join(summary.split())
+    return flat if len(flat) <= length else flat[:length - 1].rsplit(" ", 1)[0] + "…"
+
+
+def discard_upload(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def set_content_status(db, content: DocumentContent, status: str):
+    """Updates the shared content and every user's link to it. Caller commits."""
+    content.status = status
+    await db.execute(update(Document).where(Document.content_hash == content.content_hash).values(status=status))
+
+
+async def relink_legacy(db, content: DocumentContent, pages: dict[int, str]):
+    """
+    Moves documents migrated from before deduplication over to this content when
+    they are the same file. Those were keyed by sha256 of their first LEGACY_PAGES
+    pages of text, so the match is recomputed from the fresh extraction; the old
+    truncated content and everything derived from it is dropped. Caller commits.
+    """
+    old_text = "".join(pages[n] + "\n" for n in sorted(pages) if n <= LEGACY_PAGES)
+    legacy_hash = hashlib.sha256(old_text.encode("utf-8")).hexdigest()
+    legacy = await db.get(DocumentContent, legacy_hash)
+    if not legacy or not legacy.legacy:
+        return
+
+    await db.execute(
+        update(Document)
+        .where(Document.content_hash == legacy_hash)
+        .values(content_hash=content.content_hash, status=content.status)
+    )
+    for model in (DocumentChunk, DocumentPage, DocumentArtifact, GlossaryTerm):
+        await db.execute(delete(model).where(model.content_hash == legacy_hash))
+    await db.delete(legacy)
+    print(f"Re-linked legacy content {legacy_hash[:12]} to {content.content_hash[:12]}")
+
+
+async def set_stage(db, job: IngestJob, stage: str, error: str | None = None):
+    job.stage = stage
+    job.error = error
+    await db.commit()
+
+
+async def run_ingest(job_id: str):
+    """
+    Pipeline for one uploaded PDF file, shared by all its uploaders. Every stage
+    is committed so /jobs/{id} can report progress:
+    1. extracting  - pypdf in the process pool, pages stored as they arrive
+    2. indexing    - raw text + retrieval chunks
+    3. summarizing - Gemini summary
+    4. done        - content and all documents linked to it become "ready"
+                     (including ones migrated from before deduplication, see
+                     relink_legacy), then the eager artifacts are queued
+    The stored upload is removed once the job is done or failed.
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            job = await db.get(IngestJob, job_id)
+            if not job or job.stage in ("done", "failed"):
+                return
+            content = await db.get(DocumentContent, job.content_hash)
+            await set_content_status(db, content, "processing")
+
+            # 1. Extract
+            await set_stage(db, job, "extracting")
+            pages = await extract_pages(db, job)
+            text = "\n".join(pages[n] for n in sorted(pages))
+            if not text.strip():
+                await set_content_status(db, content, "failed")
+                await set_stage(db, job, "failed", "Could not extract text.")
+                discard_upload(job.file_path)
+                return
+
+            # 2. Persist text + chunk index + related-papers vector
+            await set_stage(db, job, "indexing")
+            content.raw_text = text
+            content.page_count = job.page_count
+            content.term_vector = await asyncio.to_thread(term_vector, text)  # NumPy pass, keep it off the loop
+            await index_document(db, content.content_hash, text)
+            await db.commit()
+
+            # 3. AI Summary
+            await set_stage(db, job, "summarizing")
+            prompt = f"Analyze this research paper. Provide a summary and 3 key takeaways. Text: {text[:4000]}"
+            # Raised, not stored: a failed summary marks the content "failed" (below) so the
+            # next upload of this file re-ingests instead of sharing an error string
+            content.summary = await gemini_ai.generate_response(prompt, raise_errors=True)
+            content.preview = make_preview(content.summary)
+
+            # 4. Done (and searchable by everyone who uploaded it)
+            await set_content_status(db, content, "ready")
+            await relink_legacy(db, content, pages)
+            docs = await db.scalars(select(Document).where(Document.content_hash == content.content_hash))
+            await index_documents(db, docs.unique().all(), content.summary)
+            await set_stage(db, job, "done")
+            discard_upload(job.file_path)
+
+            # 5. Graph, quiz, references... are built in the background
+            queue_artifacts(content.content_hash)
+
+        except Exception as e:
+            print(f"Ingest Error ({job_id}): {e}")
+            await db.rollback()
+            job = await db.get(IngestJob, job_id)
+            if job:
+                content = await db.get(DocumentContent, job.content_hash)
+                await set_content_status(db, content, "failed")
+                await set_stage(db, job, "failed", str(e))
+                discard_upload(job.file_path)
+
+
+ingest_pool = WorkerPool("ingest", run_ingest, workers=INGEST_WORKERS, maxsize=INGEST_QUEUE_SIZE)
+
+
+async def resume_pending_jobs():
+    """Re-queues uploads that were still in the pipeline when the server stopped."""
+    async with AsyncSessionLocal() as db:
+        pending = await db.scalars(
+            select(IngestJob.id)
+            .where(IngestJob.stage.notin_(["done", "failed"]))
+            .order_by(IngestJob.created_at)
+            .limit(INGEST_QUEUE_SIZE)
+        )
+        for job_id in pending.all():
+            ingest_pool.submit(job_id)
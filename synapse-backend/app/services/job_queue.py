@@ -0,0 +1,72 @@
+import asyncio
+
+
+class QueueFullError(Exception):
+    """Raised when a pool's wait queue is at capacity."""
+
+
+class WorkerPool:
+    """
+    A fixed number of asyncio workers draining a bounded queue.
+    `handler` is an async function called with each submitted item; its errors are
+    logged and never stop the worker. Items only live in memory, so anything that
+    must survive a restart is persisted by the caller and resubmitted on startup.
+    """
+
+    def __init__(self, name: str, handler, workers: int = 2, maxsize: int = 100):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue = None
+        self._tasks = []
+        self._reserved = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def full(self) -> bool:
+        if self._queue is None or self.maxsize <= 0:  # maxsize <= 0: unbounded, as in asyncio.Queue
+            return False
+        return self._queue.qsize() + self._reserved >= self.maxsize
+
+    def reserve(self):
+        """
+        Holds a queue slot while the caller persists the item across awaits.
+        release() it right before submit() (no await in between) or on failure.
+        """
+        if self.full():
+            raise QueueFullError(f"{self.name} queue is full")
+        self._reserved += 1
+
+    def release(self):
+        self._reserved -= 1
+
+    def submit(self, item):
+        if self._queue is None:
+            raise RuntimeError(f"{self.name} pool is not running")
+        if self.full():
+            raise QueueFullError(f"{self.name} queue is full")
+        self._queue.put_nowait(item)
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self, index: int):
+        while True:
+            item = await self._queue.get()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                print(f"{self.name} worker {index} error on {item!r}: {e}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,105 @@
+import asyncio
+import os
+from sqlalchemy import select, update
+from app.core.database import AsyncSessionLocal
+from app.models.models import Memory
+from app.services.gemini_service import gemini_ai
+from app.services.job_queue import QueueFullError, WorkerPool
+from app.services.search import set_memory_tags
+
+MEMORY_TAG_BATCH = int(os.getenv("MEMORY_TAG_BATCH", "25"))         # Notes per Gemini call
+MEMORY_TAG_WORKERS = int(os.getenv("MEMORY_TAG_WORKERS", "2"))
+MEMORY_TAG_QUEUE_SIZE = int(os.getenv("MEMORY_TAG_QUEUE_SIZE", "200"))  # Batches, not notes
+MEMORY_TAG_RETRIES = int(os.getenv("MEMORY_TAG_RETRIES", "3"))
+NOTE_CHARS = 1000  # Per note in a batch prompt
+
+
+def tags_prompt(notes: list[Memory]) -> str:
+    numbered = "\n".join(f'{i}. "{" ".join(m.content.split())[:NOTE_CHARS]}"' for i, m in enumerate(notes, 1))
+    return f"""
+    Analyze each of these short user notes and generate 3 relevant topic tags (one word each) per note.
+
+    Notes:
+    {numbered}
+
+    Return ONLY a raw JSON object mapping each note number to its tags. Example:
+    {{"1": ["DeepLearning", "Optimization", "History"], "2": ["Biology", "Genetics", "CRISPR"]}}
+    """
+
+
+def parse_tags(data: dict[str, list[str]], count: int) -> dict[int, str]:
+    """Note number (1-based) -> comma-separated tags, for the notes the response covers."""
+    tags = {}
+    for key, value in data.items():
+        try:
+            number = int(key)
+        except ValueError:
+            continue
+        words = [t.strip().replace(",", "") for t in value if t.strip()]
+        if 1 <= number <= count and words:
+            tags[number] = ", ".join(words[:3])
+    return tags
+
+
+async def tag_memories(memory_ids: list[int]):
+    """
+    Tags a batch of notes with one Gemini call. Notes the response leaves out (or
+    a failed call) are retried with exponential backoff; tag_status ends as
+    "tagged" or "failed".
+    """
+    async with AsyncSessionLocal() as db:
+        remaining = (await db.scalars(
+            select(Memory).where(Memory.id.in_(memory_ids), Memory.tag_status == "pending").order_by(Memory.id)
+        )).all()
+
+        for attempt in range(MEMORY_TAG_RETRIES):
+            if not remaining:
+                break
+            try:
+                data = await gemini_ai.generate_json(tags_prompt(remaining), dict[str, list[str]])
+                tags = parse_tags(data, len(remaining))
+            except Exception as e:
+                print(f"Memory Tagging Failed ({len(remaining)} notes, attempt {attempt + 1}): {e}")
+                tags = {}
+
+            for number, note_tags in tags.items():
+                await set_memory_tags(db, remaining[number - 1], note_tags)
+                remaining[number - 1].tag_status = "tagged"
+            await db.commit()
+            remaining = [m for m in remaining if m.tag_status == "pending"]
+
+            if remaining and attempt + 1 < MEMORY_TAG_RETRIES:
+                await asyncio.sleep(2 ** (attempt + 1))
+
+        for m in remaining:
+            m.tag_status = "failed"
+        await db.commit()
+
+
+tag_pool = WorkerPool("memory-tags", tag_memories, workers=MEMORY_TAG_WORKERS, maxsize=MEMORY_TAG_QUEUE_SIZE)
+
+
+async def queue_tagging(db, memory_ids: list[int]):
+    """
+    Splits ids into prompt-sized batches. Batches that do not fit in the queue are
+    marked "failed" (untagged) rather than left "pending" until a restart.
+    """
+    for start in range(0, len(memory_ids), MEMORY_TAG_BATCH):
+        try:
+            tag_pool.submit(memory_ids[start:start + MEMORY_TAG_BATCH])
+        except QueueFullError:
+            await db.execute(update(Memory).where(Memory.id.in_(memory_ids[start:])).values(tag_status="failed"))
+            await db.commit()
+            return
+
+
+async def resume_pending_tags():
+    """Re-queues notes that were not tagged before the server stopped."""
+    async with AsyncSessionLocal() as db:
+        pending = await db.scalars(
+            select(Memory.id)
+            .where(Memory.tag_status == "pending")
+            .order_by(Memory.id)
+            .limit(MEMORY_TAG_QUEUE_SIZE * MEMORY_TAG_BATCH)
+        )
+        await queue_tagging(db, pending.all())
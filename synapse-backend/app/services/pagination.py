@@ -0,0 +1,17 @@
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+
+# Opaque keyset cursors over (timestamp, id): clients pass next_cursor back unchanged
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{row_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        timestamp, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
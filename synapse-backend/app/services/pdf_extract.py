@@ -0,0 +1,104 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pypdf import PdfReader
+
+# NOTE: this module is imported by the worker processes, keep it free of app imports
+
+EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", str(os.cpu_count() or 2)))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "20"))
+PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "10"))
+
+_pool = None
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that already runs gRPC/DB threads is unsafe
+        _pool = ProcessPoolExecutor(max_workers=EXTRACT_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+@contextmanager
+def page_deadline(seconds: float):
+    # Pool workers run tasks on their main thread, so SIGALRM can interrupt pypdf.
+    # Platforms without SIGALRM simply extract without a deadline.
+    if not seconds or not hasattr(signal, "SIGALRM"):
+        yield
+        return
+
+    def on_alarm(signum, frame):
+        raise PageTimeout()
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def extract_range(path: str, start: int, end: int, page_timeout: float) -> list[tuple[int, str, str | None]]:
+    """
+    Runs in a worker process. Returns (page_number, text, error) for pages
+    [start, end); a page that fails or exceeds `page_timeout` gets empty text.
+    """
+    reader = PdfReader(path)
+    pages = []
+    for i in range(start, min(end, len(reader.pages))):
+        try:
+            with page_deadline(page_timeout):
+                text = reader.pages[i].extract_text() or ""
+            pages.append((i + 1, text, None))
+        except PageTimeout:
+            pages.append((i + 1, "", "timeout"))
+        except Exception as e:
+            pages.append((i + 1, "", str(e)[:200]))
+    return pages
+
+
+async def iter_page_batches(path: str):
+    """
+    Extracts every page of the PDF in the process pool, split into page ranges
+    across the workers. Yields (page_count, batch) as each range completes, so
+    callers can store pages while the rest is still being extracted.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+
+    total = await loop.run_in_executor(pool, count_pages, path)
+    if total == 0:
+        return
+
+    size = max(1, min(PAGES_PER_TASK, math.ceil(total / EXTRACT_PROCESSES)))
+    futures = [
+        loop.run_in_executor(pool, extract_range, path, start, start + size, PAGE_TIMEOUT)
+        for start in range(0, total, size)
+    ]
+    try:
+        for next_batch in asyncio.as_completed(futures):
+            yield total, await next_batch
+    finally:
+        for future in futures:
+            future.cancel()
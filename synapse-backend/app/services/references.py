@@ -0,0 +1,80 @@
+import os
+import re
+
+# Below this the bibliography is sent to Gemini instead
+MIN_CONFIDENCE = float(os.getenv("REFERENCES_MIN_CONFIDENCE", "0.75"))
+TAIL_CHARS = 20000  # Same window the Gemini prompt gets when no heading is found
+
+HEADING = re.compile(
+    r"^[ \t]*(?:\d+\.?[ \t]*)?(references|bibliography|works cited|literature cited|reference list)[ \t]*:?[ \t]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
+SECTION_END = re.compile(r"^[ \t]*(appendix|appendices|supplementary material)\b", re.IGNORECASE | re.MULTILINE)
+
+# Entry markers at the start of a line: "[12] Smith ..." or "12. Smith ..."
+MARKERS = {
+    "bracket": re.compile(r"^[ \t]*\[(\d{1,3})\][ \t]*", re.MULTILINE),
+    "dotted": re.compile(r"^[ \t]*(\d{1,3})\.[ \t]+(?=\S)", re.MULTILINE),
+}
+YEAR = re.compile(r"\b(1[89]|20)\d\d\b")
+
+
+def locate_section(text: str) -> tuple[str, bool]:
+    """Text after the last references heading (up to an appendix), or the tail of the paper."""
+    headings = list(HEADING.finditer(text))
+    if not headings:
+        return text[-TAIL_CHARS:], False
+    section = text[headings[-1].end():]
+    end = SECTION_END.search(section)
+    return (section[:end.start()] if end else section), True
+
+
+def split_entries(section: str, marker: re.Pattern) -> list[tuple[int, str]]:
+    matches = list(marker.finditer(section))
+    entries = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(section)
+        body = section[m.end():end]
+        body = re.sub(r"-\n(?=[a-z])", "", body)  # Re-join words hyphenated across lines
+        entries.append((int(m.group(1)), " ".join(body.split())))
+    return entries
+
+
+def score(entries: list[tuple[int, str]]) -> float:
+    """
+    0..1: numbering runs 1, 2, 3... without gaps or repeats, entries have a
+    plausible length, and most of them contain a year.
+    """
+    if len(entries) < 3:
+        return 0.0
+    numbers = [n for n, _ in entries]
+    sequential = sum(1 for a, b in zip(numbers, numbers[1:]) if b == a + 1) / (len(numbers) - 1)
+    if numbers[0] != 1:
+        sequential *= 0.8
+    sized = sum(1 for _, body in entries if 20 <= len(body) <= 1000) / len(entries)
+    dated = sum(1 for _, body in entries if YEAR.search(body)) / len(entries)
+    return 0.5 * sequential + 0.25 * sized + 0.25 * dated
+
+
+def parse_references(text: str) -> tuple[dict[str, str], float]:
+    """
+    Rule-based bibliography splitter for "[n]" and "n." styles.
+    Returns ({"1": "...", ...}, confidence); callers fall back to the LLM when
+    the confidence is below MIN_CONFIDENCE.
+    """
+    section, found_heading = locate_section(text)
+
+    best, best_score = [], 0.0
+    for marker in MARKERS.values():
+        entries = split_entries(section, marker)
+        entry_score = score(entries)
+        if entry_score > best_score:
+            best, best_score = entries, entry_score
+
+    if not found_heading:
+        best_score *= 0.8  # Markers found without a heading are less trustworthy
+
+    refs = {}
+    for number, body in best:
+        refs.setdefault(str(number), body)
+    return refs, round(best_score, 3)
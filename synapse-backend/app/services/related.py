@@ -0,0 +1,101 @@
+import os
+import zlib
+import numpy as np
+from sqlalchemy import select
+from app.models.models import Document, DocumentContent
+from app.services.cache import LRUCache
+from app.services.documents import fingerprint, get_document
+from app.services.retrieval import tokenize
+
+VECTOR_DIM = int(os.getenv("RELATED_VECTOR_DIM", "4096"))   # Hashed term buckets (float32 each)
+
+# content_hash -> unit vector; contents never change once ingested
+vector_cache = LRUCache(max_entries=int(os.getenv("RELATED_VECTOR_CACHE", "5000")))
+# user_id -> (library fingerprint, rows, idf-weighted unit matrix)
+library_cache = LRUCache(max_entries=256)
+
+
+def term_vector(text: str, dim: int = VECTOR_DIM) -> bytes:
+    """Hashed, sublinear term-frequency vector of a text, L2-normalized, as float32 bytes."""
+    buckets = np.fromiter((zlib.crc32(t.encode("utf-8")) % dim for t in tokenize(text)), dtype=np.int64)
+    counts = np.bincount(buckets, minlength=dim).astype(np.float32)
+    vector = np.log1p(counts, where=counts > 0, out=np.zeros(dim, dtype=np.float32))
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tobytes()
+
+
+async def load_vectors(db, content_hashes: list[str]) -> dict:
+    """Vectors for the given contents (cache first, then one query). Contents without one are left out."""
+    found = {}
+    missing = []
+    for h in content_hashes:
+        vector = vector_cache.get(h)
+        if vector is None:
+            missing.append(h)
+        else:
+            found[h] = vector
+
+    if missing:
+        rows = await db.execute(
+            select(DocumentContent.content_hash, DocumentContent.term_vector)
+            .where(DocumentContent.content_hash.in_(missing), DocumentContent.term_vector.is_not(None))
+        )
+        for h, data in rows.all():
+            vector = np.frombuffer(data, dtype=np.float32)
+            if len(vector) == VECTOR_DIM:  # Stored with another RELATED_VECTOR_DIM: skipped until re-ingested
+                vector_cache.set(h, vector)
+                found[h] = vector
+    return found
+
+
+async def library_matrix(db, user_id: str):
+    """
+    A user's ready documents and their vectors stacked into one matrix, reweighted
+    by the library's IDF. Rebuilt only when the set of documents changes, and then
+    only newly added contents are read from the database.
+    """
+    rows = (await db.execute(
+        select(Document.id, Document.filename, Document.content_hash)
+        .where(Document.user_id == user_id, Document.status == "ready")
+        .order_by(Document.id)
+    )).all()
+    current = fingerprint(rows)
+    cached = library_cache.get(user_id)
+    if cached and cached[0] == current:
+        return cached[1], cached[2]
+
+    vectors = await load_vectors(db, list({r.content_hash for r in rows}))
+    rows = [r for r in rows if r.content_hash in vectors]
+    if not rows:
+        return [], np.zeros((0, VECTOR_DIM), dtype=np.float32)
+
+    matrix = np.stack([vectors[r.content_hash] for r in rows])
+    df = np.count_nonzero(matrix, axis=0)
+    idf = np.log((len(rows) + 1) / (df + 1)).astype(np.float32) + 1
+    matrix = matrix * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+
+    library_cache.set(user_id, (current, rows, matrix))
+    return rows, matrix
+
+
+async def related_documents(db, doc_id: int, limit: int = 5) -> list[dict]:
+    """Most similar documents in the same user's library (cosine over term vectors, no AI call)."""
+    doc = await get_document(db, doc_id)
+    rows, matrix = await library_matrix(db, doc.user_id)
+    position = next((i for i, r in enumerate(rows) if r.id == doc_id), None)
+    if position is None:
+        return []  # Still processing, or ingested before vectors existed
+
+    scores = matrix @ matrix[position]
+    # Other uploads of the same file are not "related", they are the same paper
+    same = np.array([r.content_hash == doc.content_hash for r in rows])
+    scores[same] = -1
+
+    k = min(limit, int((~same).sum()))
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [{"id": rows[i].id, "filename": rows[i].filename, "score": float(scores[i])} for i in top if scores[i] > 0]
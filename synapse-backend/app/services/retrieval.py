@@ -0,0 +1,167 @@
+import asyncio
+import json
+import math
+import os
+import re
+from collections import Counter
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import DocumentChunk
+from app.services.cache import LRUCache
+
+# Chunking + ranking settings (a token is roughly 4 characters of English text)
+CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "220"))
+CHUNK_OVERLAP = int(os.getenv("RETRIEVAL_CHUNK_OVERLAP", "40"))
+TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "6000"))
+CHARS_PER_TOKEN = 4
+INDEX_CACHE_DOCS = int(os.getenv("RETRIEVAL_INDEX_CACHE_DOCS", "64"))
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "in", "is", "it", "its", "of", "on", "or", "that", "the", "this", "to", "was",
+    "we", "what", "when", "where", "which", "who", "why", "with", "paper", "about", "their",
+    "they", "these", "those", "there", "than", "then", "also", "into", "our", "use", "used",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+# content_hash -> decoded chunk index (see decode_index), so a chat question does
+# not re-parse the terms JSON of every chunk
+index_cache = LRUCache(max_entries=INDEX_CACHE_DOCS)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def chunk_text(text: str, words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> list[str]:
+    """
+    Splits text into overlapping windows of `words` words, so a passage cut at a
+    window edge still appears whole in the neighbouring chunk.
+    """
+    tokens = text.split()
+    if not tokens:
+        return []
+    step = max(words - overlap, 1)
+    chunks = []
+    for start in range(0, len(tokens), step):
+        chunks.append(" ".join(tokens[start:start + words]))
+        if start + words >= len(tokens):
+            break
+    return chunks
+
+
+def build_chunks(content_hash: str, text: str) -> list[DocumentChunk]:
+    rows = []
+    for i, content in enumerate(chunk_text(text)):
+        terms = Counter(tokenize(content))
+        rows.append(DocumentChunk(
+            content_hash=content_hash,
+            ordinal=i,
+            content=content,
+            terms=json.dumps(terms),
+            length=sum(terms.values()),
+        ))
+    return rows
+
+
+async def index_document(db: AsyncSession, content_hash: str, text: str) -> int:
+    """Replaces the chunk index of a document content. Caller commits."""
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.content_hash == content_hash))
+    index_cache.pop(content_hash)
+    rows = await asyncio.to_thread(build_chunks, content_hash, text)  # CPU-bound on long papers
+    db.add_all(rows)
+    return len(rows)
+
+
+def bm25_scores(query_terms: list[str], chunk_terms: list[Counter], lengths: list[int]) -> list[float]:
+    n = len(chunk_terms)
+    if n == 0:
+        return []
+    avg_len = (sum(lengths) / n) or 1.0
+    scores = [0.0] * n
+    for term in set(query_terms):
+        df = sum(1 for tf in chunk_terms if term in tf)
+        if df == 0:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for i, tf in enumerate(chunk_terms):
+            f = tf.get(term, 0)
+            if f:
+                scores[i] += idf * f * (K1 + 1) / (f + K1 * (1 - B + B * lengths[i] / avg_len))
+    return scores
+
+
+def decode_index(rows) -> tuple:
+    """(ids, ordinals, term counters, lengths) of a document's chunk rows."""
+    return (
+        [r.id for r in rows],
+        [r.ordinal for r in rows],
+        [Counter(json.loads(r.terms)) for r in rows],
+        [r.length for r in rows],
+    )
+
+
+def rank_chunks(index: tuple, question: str, top_k: int) -> list[int]:
+    """Ids of the top_k chunks for `question`, best first."""
+    ids, ordinals, chunk_terms, lengths = index
+    scores = bm25_scores(tokenize(question), chunk_terms, lengths)
+
+    # Best chunks first; if nothing matches (e.g. "summarize this"), read from the start
+    if any(scores):
+        ranked = sorted(range(len(ids)), key=lambda i: scores[i], reverse=True)
+        ranked = [i for i in ranked if scores[i] > 0]
+    else:
+        ranked = sorted(range(len(ids)), key=lambda i: ordinals[i])
+    return [ids[i] for i in ranked[:top_k]]
+
+
+async def select_passages(db: AsyncSession, content_hash: str, question: str, load_text=None,
+                    token_budget: int = CONTEXT_TOKENS, top_k: int = TOP_K) -> list[str]:
+    """
+    Returns the most relevant chunks of a document for `question`, in reading order,
+    within `token_budget`. Documents indexed before chunking existed are indexed on
+    first use from the text returned by `await load_text()`, so the (compressed) full
+    text is only read in that case.
+    """
+    index = index_cache.get(content_hash)
+    if index is None:
+        chunk_rows = (
+            select(DocumentChunk.id, DocumentChunk.ordinal, DocumentChunk.terms, DocumentChunk.length)
+            .where(DocumentChunk.content_hash == content_hash)
+        )
+        rows = (await db.execute(chunk_rows)).all()
+        raw_text = await load_text() if not rows and load_text else None
+        if raw_text:
+            await index_document(db, content_hash, raw_text)
+            await db.commit()
+            rows = (await db.execute(chunk_rows)).all()
+        if not rows:
+            return []
+        index = await asyncio.to_thread(decode_index, rows)
+        index_cache.set(content_hash, index)
+
+    # BM25 over every chunk is CPU-bound on long papers
+    picked_ids = await asyncio.to_thread(rank_chunks, index, question, top_k)
+    contents = {
+        c.id: c for c in (await db.scalars(select(DocumentChunk).where(DocumentChunk.id.in_(picked_ids)))).all()
+    }
+
+    if len(contents) < len(picked_ids):
+        index_cache.pop(content_hash)  # Re-indexed by another process; reload next time
+
+    budget = token_budget * CHARS_PER_TOKEN
+    chosen = []
+    for chunk_id in picked_ids:
+        chunk = contents.get(chunk_id)
+        if chunk is None or len(chunk.content) > budget:
+            continue
+        budget -= len(chunk.content)
+        chosen.append(chunk)
+
+    return [c.content for c in sorted(chosen, key=lambda c: c.ordinal)]
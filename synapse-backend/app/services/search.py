@@ -0,0 +1,138 @@
+import re
+from sqlalchemy import column, delete, func, literal_column, select, table, update
+from app.models.models import MemoryTag, SearchEntry, search_vector
+
+SNIPPET_CHARS = 240
+FACET_LIMIT = 20
+
+# SQLite FTS5 table created next to search_entries (see models.py); rank is bm25()
+search_fts = table("search_fts", column("rowid"), column("rank"))
+
+
+def normalize_tags(tags: str | None) -> list[str]:
+    """"DeepLearning, #optimization, History" -> ["deeplearning", "optimization", "history"]"""
+    seen = []
+    for tag in (tags or "").split(","):
+        tag = tag.strip().lstrip("#").strip().lower()
+        if tag and tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+# --- Write side (callers commit) ---
+
+def memory_entry(memory) -> SearchEntry:
+    return SearchEntry(
+        user_id=memory.user_id,
+        kind="memory",
+        ref_id=memory.id,
+        body=memory.content,
+        tags=", ".join(normalize_tags(memory.tags)) or None,
+        timestamp=memory.timestamp,
+    )
+
+
+def index_memories(db, memories):
+    """Indexes newly inserted (flushed) memories."""
+    db.add_all([memory_entry(m) for m in memories])
+
+
+async def set_memory_tags(db, memory, tags: str):
+    """Stores the tag string and its normalized rows, and makes the tags searchable."""
+    memory.tags = tags
+    normalized = normalize_tags(tags)
+    await db.execute(delete(MemoryTag).where(MemoryTag.memory_id == memory.id))
+    db.add_all([MemoryTag(memory_id=memory.id, user_id=memory.user_id, tag=t) for t in normalized])
+    await db.execute(
+        update(SearchEntry)
+        .where(SearchEntry.kind == "memory", SearchEntry.ref_id == memory.id)
+        .values(tags=", ".join(normalized) or None)
+    )
+
+
+async def index_documents(db, docs, summary: str | None):
+    """Indexes (or refreshes) document links once their content is ready."""
+    existing = {
+        e.ref_id: e for e in (await db.scalars(
+            select(SearchEntry).where(SearchEntry.kind == "document", SearchEntry.ref_id.in_([d.id for d in docs]))
+        )).all()
+    }
+    for doc in docs:
+        entry = existing.get(doc.id)
+        if entry is None:
+            entry = SearchEntry(user_id=doc.user_id, kind="document", ref_id=doc.id, timestamp=doc.upload_date)
+            db.add(entry)
+        entry.title = doc.filename
+        entry.body = summary
+
+
+# --- Read side ---
+
+def fts_match(query: str) -> str | None:
+    """User input -> FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", query.lower())
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+async def search(db, user_id: str, query: str = "", kind: str | None = None, tag: str | None = None,
+                 limit: int = 20, offset: int = 0) -> dict:
+    """
+    Ranked full-text search over a user's memories and documents (newest first
+    without a query), plus tag facet counts over every matching memory.
+    """
+    stmt = select(SearchEntry.kind, SearchEntry.ref_id, SearchEntry.title, SearchEntry.body,
+                  SearchEntry.tags, SearchEntry.timestamp).where(SearchEntry.user_id == user_id)
+    if kind:
+        stmt = stmt.where(SearchEntry.kind == kind)
+    if tag:
+        tagged = select(MemoryTag.memory_id).where(MemoryTag.user_id == user_id, MemoryTag.tag == tag.strip().lower())
+        stmt = stmt.where(SearchEntry.kind == "memory", SearchEntry.ref_id.in_(tagged))
+
+    score = None
+    if query.strip():
+        if db.bind.dialect.name == "postgresql":
+            ts_query = func.websearch_to_tsquery(literal_column("'english'"), query)
+            stmt = stmt.where(search_vector().op("@@")(ts_query))
+            score = func.ts_rank(search_vector(), ts_query)
+            order = score.desc()
+        else:
+            match = fts_match(query)
+            if match is None:
+                return {"items": [], "facets": []}
+            stmt = (
+                stmt.join(search_fts, search_fts.c.rowid == SearchEntry.id)
+                .where(literal_column("search_fts").op("MATCH")(match))
+            )
+            score = -search_fts.c.rank  # bm25(): lower is better
+            order = search_fts.c.rank
+    else:
+        order = SearchEntry.timestamp.desc()
+
+    page = stmt.add_columns((score if score is not None else literal_column("0")).label("score"))
+    rows = (await db.execute(page.order_by(order, SearchEntry.id.desc()).limit(limit).offset(offset))).all()
+
+    # Facets: tag counts over every matching memory, not just this page
+    matching_memories = stmt.with_only_columns(SearchEntry.ref_id).where(SearchEntry.kind == "memory")
+    facets = (await db.execute(
+        select(MemoryTag.tag, func.count().label("count"))
+        .where(MemoryTag.user_id == user_id, MemoryTag.memory_id.in_(matching_memories))
+        .group_by(MemoryTag.tag)
+        .order_by(func.count().desc(), MemoryTag.tag)
+        .limit(FACET_LIMIT)
+    )).all()
+
+    return {
+        "items": [
+            {
+                "kind": r.kind,
+                "id": r.ref_id,
+                "title": r.title,
+                "snippet": " ".join((r.body or "").split())[:SNIPPET_CHARS],
+                "tags": r.tags.split(", ") if r.tags else [],
+                "timestamp": r.timestamp,
+                "score": float(r.score),
+            }
+            for r in rows
+        ],
+        "facets": [{"tag": f.tag, "count": f.count} for f in facets],
+    }
@@ -0,0 +1,37 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one upstream call.
+    The first caller starts the work as a task; everyone arriving while it runs
+    awaits the same task. The key is dropped as soon as the task settles, so a
+    failure reaches every waiter but is never handed to later callers.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "followers": 0}
+
+    async def do(self, key: str, factory):
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.stats["followers"] += 1
+
+        # shield: one waiter disconnecting must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self):
+        return len(self._inflight)
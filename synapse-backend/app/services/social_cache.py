@@ -0,0 +1,36 @@
+import os
+from app.services.cache import LRUCache
+
+# Per-process caches for the community feed. Writes invalidate the affected
+# entries right away; the TTL bounds staleness across multiple server processes.
+ANSWERS_TTL = float(os.getenv("SOCIAL_ANSWERS_CACHE_TTL", "30"))
+FEED_TTL = float(os.getenv("SOCIAL_FEED_CACHE_TTL", "10"))
+
+# question id -> answers sorted by votes (plain dicts, safe to share between sessions)
+answers_cache = LRUCache(max_entries=1024, default_ttl=ANSWERS_TTL)
+
+# (cursor, limit) -> feed page. Any write can move items between pages, so
+# writes drop every cached page rather than trying to patch them.
+feed_cache = LRUCache(max_entries=256, default_ttl=FEED_TTL)
+
+
+def answer_dict(a) -> dict:
+    return {
+        "id": a.id,
+        "question_id": a.question_id,
+        "user_id": a.user_id,
+        "content": a.content,
+        "is_ai": a.is_ai,
+        "votes": a.votes,
+        "timestamp": a.timestamp,
+    }
+
+
+def invalidate_feed():
+    feed_cache.clear()
+
+
+def invalidate_question(question_id: int):
+    """New answer or vote: the answer list and the feed's count / top answer change."""
+    answers_cache.pop(question_id)
+    invalidate_feed()
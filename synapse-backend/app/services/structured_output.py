@@ -0,0 +1,131 @@
+import json
+from pydantic import TypeAdapter
+
+# Keys of a JSON schema that Gemini's response_schema understands
+SCHEMA_KEYS = {"type", "properties", "items", "required", "enum", "description", "nullable", "format"}
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def mark(out: list, stack: list) -> tuple:
+    return len(out), tuple(stack)
+
+
+def repair_json(text: str) -> str:
+    """
+    Best-effort fix of near-valid model output: drops Markdown fences and any prose
+    around the first JSON value, removes trailing commas, and closes a truncated
+    value after its last complete element.
+    """
+    text = text.replace("```json", "").replace("```", "")
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON value in response")
+
+    out, stack = [], []
+    # (output length, open containers) where cutting leaves a valid prefix; cuts between
+    # array elements are preferred, so a truncated list loses its last element, not a field
+    safe = element_safe = (0, ())
+    in_string = escaped = False
+    for ch in text[min(starts):]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+            out.append(ch)
+            safe = mark(out, stack)
+            element_safe = safe if ch == "[" else element_safe
+            continue
+        elif ch in "}]":
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()  # Trailing comma
+            if stack:
+                stack.pop()
+            out.append(ch)
+            safe = mark(out, stack)
+            element_safe = safe if not stack or stack[-1] == "]" else element_safe
+            if not stack:
+                break      # Anything after the value is prose
+            continue
+        elif ch == ",":
+            safe = mark(out, stack)
+            element_safe = safe if stack and stack[-1] == "]" else element_safe
+        out.append(ch)
+
+    if stack or in_string:
+        # Truncated: keep the complete elements and close what is still open
+        length, open_containers = element_safe if element_safe[0] else safe
+        out = out[:length]
+        while out and (out[-1].isspace() or out[-1] == ","):
+            out.pop()
+        out.extend(reversed(open_containers))
+    return "".join(out)
+
+
+def parse_structured(response: str, adapter: TypeAdapter) -> tuple:
+    """
+    (validated JSON-ready data, whether it needed repair) for a model response.
+    Raises ValueError if even the repaired text does not fit.
+    """
+    try:
+        data, repaired = json.loads(response), False
+    except ValueError:
+        data, repaired = json.loads(repair_json(response)), True
+    return adapter.dump_python(adapter.validate_python(data), mode="json"), repaired
+
+
+def gemini_schema(model) -> dict | None:
+    """
+    response_schema for a pydantic model (or list of models), in the OpenAPI subset
+    Gemini accepts. None for free-form maps such as dict[str, str], which it cannot express.
+    """
+    schema = TypeAdapter(model).json_schema()
+    defs = schema.get("$defs", {})
+
+    def convert(node: dict) -> dict | None:
+        if "$ref" in node:
+            return convert(defs[node["$ref"].split("/")[-1]])
+        if "anyOf" in node:
+            options = [o for o in node["anyOf"] if o.get("type") != "null"]
+            converted = convert(options[0]) if len(options) == 1 else None
+            if converted is not None and len(options) < len(node["anyOf"]):
+                converted["nullable"] = True
+            return converted
+        if node.get("type") == "object" and not node.get("properties"):
+            return None
+        result = {k: v for k, v in node.items() if k in SCHEMA_KEYS}
+        if "properties" in node:
+            result["properties"] = {}
+            for name, prop in node["properties"].items():
+                converted = convert(prop)
+                if converted is None:
+                    return None
+                result["properties"][name] = converted
+        if "items" in node:
+            result["items"] = convert(node["items"])
+            if result["items"] is None:
+                return None
+        return result
+
+    return convert(schema)
+
+
+def reask_prompt(response: str, error: Exception, schema: dict | None) -> str:
+    expected = f"It must match this JSON schema:\n    {json.dumps(schema)}\n" if schema else ""
+    return f"""
+    This output was supposed to be valid JSON but could not be used.
+    Error: {str(error)[:500]}
+    {expected}
+    Output: {response[-12000:]}
+
+    Return ONLY the corrected JSON, keeping all of its content.
+    """
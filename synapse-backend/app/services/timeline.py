@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.core.database import AsyncSessionLocal
+from app.models.models import Document, DocumentContent, Timeline
+from app.services.documents import fingerprint
+from app.services.gemini_service import gemini_ai
+from app.services.single_flight import SingleFlight
+
+BATCH_SIZE = int(os.getenv("TIMELINE_BATCH_SIZE", "20"))            # Papers per Gemini call on a full build
+INCREMENTAL_MAX = int(os.getenv("TIMELINE_INCREMENTAL_MAX", "5"))   # More new papers than this: rebuild
+SUMMARY_CHARS = int(os.getenv("TIMELINE_SUMMARY_CHARS", "1500"))
+
+# One build per user at a time; concurrent views wait for it instead of paying again
+_builds = SingleFlight()
+
+EVENT_FORMAT = """
+    [
+        {
+            "year": "2018 (Derived from text)",
+            "title": "The Transformer Shift",
+            "description": "Paper 'Attention is All You Need' introduced self-attention, moving away from RNNs.",
+            "doc_id": 12
+        }
+    ]
+"""
+
+
+def papers_text(papers) -> str:
+    return "\n".join(f"ID: {p.id} | Title: {p.filename} | Summary: {(p.summary or '')[:SUMMARY_CHARS]}" for p in papers)
+
+
+class TimelineEvent(BaseModel):
+    model_config = ConfigDict(coerce_numbers_to_str=True)  # "year": 2018
+
+    year: str
+    title: str
+    description: str
+    doc_id: int
+
+
+class PlacedEvent(TimelineEvent):
+    insert_after: int | None = None  # See placement_prompt; missing means "at the end"
+
+
+async def ask_events(prompt: str, doc_ids: set[int], model=TimelineEvent) -> list[dict]:
+    """Validated events from Gemini, keeping only events that point at one of `doc_ids`."""
+    events = await gemini_ai.generate_json(prompt, list[model])
+    return [e for e in events if e["doc_id"] in doc_ids]
+
+
+def timeline_prompt(papers) -> str:
+    return f"""
+    Analyze these research papers and construct a chronological "Timeline of Ideas".
+    Identify how concepts evolved from one paper to the next.
+
+    Papers:
+    {papers_text(papers)}
+
+    Return a JSON array ONLY. Format:
+    {EVENT_FORMAT}
+    Sort by logical progression or date.
+    """
+
+
+def merge_prompt(events: list[dict]) -> str:
+    return f"""
+    These partial "Timelines of Ideas" were built from separate batches of one user's research papers.
+    Merge them into a single chronological timeline: order the events by date or logical progression
+    and rewrite descriptions only where needed to show how ideas evolved across batches.
+    Keep every doc_id.
+
+    Events:
+    {json.dumps(events)}
+
+    Return a JSON array ONLY. Format:
+    {EVENT_FORMAT}
+    """
+
+
+def placement_prompt(events: list[dict], new_papers) -> str:
+    outline = "\n".join(f"{i}. {e.get('year')} | {e.get('title')} (doc {e['doc_id']})" for i, e in enumerate(events))
+    return f"""
+    A user's "Timeline of Ideas" currently has these events, in order:
+    {outline}
+
+    New papers were added to their library:
+    {papers_text(new_papers)}
+
+    Write one timeline event for each new paper and say where it belongs.
+    "insert_after" is the number of the existing event it follows (-1 for the very start).
+    Do not repeat the existing events.
+
+    Return a JSON array ONLY. Format:
+    [
+        {{"insert_after": 3, "year": "2020", "title": "...", "description": "...", "doc_id": 42}}
+    ]
+    """
+
+
+async def build_full(papers) -> list[dict]:
+    """Whole library: one call, or map-reduce over batches for large libraries."""
+    doc_ids = {p.id for p in papers}
+    if len(papers) <= BATCH_SIZE:
+        return await ask_events(timeline_prompt(papers), doc_ids)
+
+    # Map: a partial timeline per batch (GeminiService bounds how many run at once)
+    batches = [papers[i:i + BATCH_SIZE] for i in range(0, len(papers), BATCH_SIZE)]
+    partials = await asyncio.gather(*(ask_events(timeline_prompt(b), {p.id for p in b}) for b in batches))
+    events = [e for partial in partials for e in partial]
+
+    # Reduce: merge the short events, not the summaries
+    try:
+        return await ask_events(merge_prompt(events), doc_ids)
+    except Exception as e:
+        print(f"Timeline merge failed, keeping batch order: {e}")
+        return events
+
+
+async def place_new(events: list[dict], new_papers) -> list[dict]:
+    """Asks only for the new papers' events and splices them into the stored timeline."""
+    placed = await ask_events(placement_prompt(events, new_papers), {p.id for p in new_papers}, PlacedEvent)
+
+    after: dict[int, list[dict]] = {}
+    for e in placed:
+        position = e.pop("insert_after")
+        position = len(events) - 1 if position is None else position
+        after.setdefault(min(max(position, -1), len(events) - 1), []).append(e)
+
+    merged = after.get(-1, [])
+    for i, e in enumerate(events):
+        merged.append(e)
+        merged.extend(after.get(i, []))
+    return merged
+
+
+async def get_timeline(user_id: str) -> list[dict]:
+    return await _builds.do(user_id, lambda: refresh_timeline(user_id))
+
+
+async def refresh_timeline(user_id: str) -> list[dict]:
+    """
+    Serves the stored timeline while the user's ready documents are unchanged.
+    Removed papers are dropped locally, a few new papers are placed into the
+    existing timeline, anything bigger is a full (batched) rebuild.
+    """
+    async with AsyncSessionLocal() as db:
+        # 1. Current library: ids and hashes only
+        rows = (await db.execute(
+            select(Document.id, Document.content_hash)
+            .where(Document.user_id == user_id, Document.status == "ready")
+        )).all()
+        if len(rows) < 2:
+            return []  # Need at least 2 papers to make a timeline
+
+        # 2. Unchanged library: no AI call
+        stored = await db.get(Timeline, user_id)
+        current = fingerprint(rows)
+        if stored and stored.fingerprint == current:
+            return json.loads(stored.events)
+
+        doc_ids = {r.id for r in rows}
+        known = set(json.loads(stored.doc_ids)) & doc_ids if stored else set()
+        new_ids = doc_ids - known
+
+        async def papers(ids):
+            # Summaries are only loaded for the papers that go into a prompt
+            return (await db.execute(
+                select(Document.id, Document.filename, DocumentContent.summary)
+                .join(DocumentContent, Document.content_hash == DocumentContent.content_hash)
+                .where(Document.id.in_(ids))
+                .order_by(Document.id)
+            )).all()
+
+        # 3. Incremental update, or a full build
+        try:
+            if known and len(new_ids) <= INCREMENTAL_MAX:
+                events = [e for e in json.loads(stored.events) if e.get("doc_id") in doc_ids]
+                if new_ids:
+                    events = await place_new(events, await papers(new_ids))
+            else:
+                events = await build_full(await papers(doc_ids))
+        except Exception as e:
+            print(f"Timeline Error: {e}")
+            if stored:
+                return [ev for ev in json.loads(stored.events) if ev.get("doc_id") in doc_ids]
+            return []
+
+        # 4. Store it for the next view
+        if stored is None:
+            stored = Timeline(user_id=user_id)
+            db.add(stored)
+        stored.fingerprint = current
+        stored.doc_ids = json.dumps(sorted(doc_ids))
+        stored.events = json.dumps(events)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()  # Another process stored it first; theirs is just as good
+
+        return events
@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+try:
+    from gtts import gTTS
+except ImportError:  # Only needed by the gtts backend
+    gTTS = None
+
+TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")          # gtts | stub
+TTS_LANG = os.getenv("TTS_LANG", "en")
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))         # Segments synthesized at once, across all requests
+TTS_LOOKAHEAD = int(os.getenv("TTS_LOOKAHEAD", "6"))     # Segments one stream may have queued ahead of playback
+TTS_SEGMENT_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", "300"))
+TTS_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", "20000"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".cache/tts")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "500"))
+TRIM_EVERY = 200  # Segment writes between cache size checks
+
+SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+
+class GTTSBackend:
+    """Google Translate TTS (network call per segment)."""
+
+    name = "gtts"
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        if gTTS is None:
+            raise RuntimeError("gTTS is not installed (pip install gTTS)")
+        mp3_fp = BytesIO()
+        gTTS(text=text, lang=lang, slow=False).write_to_fp(mp3_fp)
+        return mp3_fp.getvalue()
+
+
+class StubBackend:
+    """Offline stand-in for tests and development: one silent MP3 frame per 50 characters."""
+
+    name = "stub"
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames
+    FRAME = bytes.fromhex("fffb9064") + bytes(413)
+
+    def synthesize(self, text: str, lang: str) -> bytes:
+        return self.FRAME * max(1, len(text) // 50)
+
+
+BACKENDS = {backend.name: backend for backend in (GTTSBackend, StubBackend)}
+
+
+def split_segments(text: str, max_chars: int = TTS_SEGMENT_CHARS) -> list[str]:
+    """
+    Sentence-aligned segments of at most `max_chars` (a single longer sentence is
+    cut at word boundaries). Short sentences are packed together so each segment
+    is one reasonably sized request.
+    """
+    segments, current = [], ""
+    for sentence in SENTENCE_END.split(" ".join(text.split())):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                segments.append(current)
+                current = ""
+            segments.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            segments.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        segments.append(current)
+    return segments
+
+
+class SpeechService:
+    """
+    Segment-pipelined text-to-speech. Segments are synthesized in a bounded thread
+    pool and yielded strictly in order, so playback starts after the first one.
+    Every segment is cached on disk by (backend, language, text) hash; the least
+    recently used segments are removed once the cache exceeds TTS_CACHE_MAX_MB.
+    """
+
+    def __init__(self, backend: str = TTS_BACKEND, lang: str = TTS_LANG, cache_dir: str = TTS_CACHE_DIR):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown TTS backend '{backend}' (choose from {', '.join(BACKENDS)})")
+        self.backend = BACKENDS[backend]()
+        self.lang = lang
+        self.cache_dir = os.path.join(cache_dir, self.backend.name, lang) if cache_dir else None
+        self._executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+        self._writes_since_trim = 0
+        self._trim_lock = threading.Lock()
+
+    def _cache_path(self, segment: str) -> str | None:
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha256(segment.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def _synthesize_cached(self, segment: str) -> bytes:
+        # Runs in the thread pool
+        path = self._cache_path(segment)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    audio = f.read()
+                os.utime(path)  # mtime is last use, for trim_cache
+                return audio
+            except OSError:
+                pass  # Trimmed in between: synthesize again
+
+        audio = self.backend.synthesize(segment, self.lang)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp file: the same segment may be synthesized by two threads at once
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+                f.write(audio)
+            os.replace(f.name, path)  # Readers never see a partial file
+            with self._trim_lock:
+                self._writes_since_trim += 1
+                due = self._writes_since_trim >= TRIM_EVERY
+            if due:
+                self.trim_cache()
+        return audio
+
+    def trim_cache(self):
+        """Removes least recently used segments until the cache fits TTS_CACHE_MAX_MB (also run at startup)."""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        with self._trim_lock:
+            self._writes_since_trim = 0
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith(".mp3"):
+                    continue  # .tmp files are still being written
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        limit = TTS_CACHE_MAX_MB * 1024 * 1024
+        for _, size, path in sorted(files):
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    async def stream(self, text: str):
+        """Yields MP3 bytes segment by segment, in order."""
+        segments = split_segments(text[:TTS_MAX_CHARS])
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        next_index = 0
+        try:
+            while next_index < len(segments) or pending:
+                # Keep a bounded window queued so one long text cannot starve other streams
+                while next_index < len(segments) and len(pending) < TTS_LOOKAHEAD:
+                    pending.append(loop.run_in_executor(self._executor, self._synthesize_cached, segments[next_index]))
+                    next_index += 1
+                yield await pending.popleft()
+        finally:
+            # Client went away (or a segment failed): drop what has not started yet
+            for future in pending:
+                future.cancel()
+
+
+speech = SpeechService()
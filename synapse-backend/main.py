@@ -1,6 +1,7 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import engine, Base
+from app.core.database import engine, async_engine, Base
 from app.services.gemini_service import gemini_ai  # Import the AI service
 from app.api import pdf
 from app.api import pdf, graph
@@ -13,10 +14,43 @@ from app.api import pdf, graph, lens, audio, citation, quiz, chat, social
 from app.api import pdf, graph, lens, audio, citation, quiz, chat, social, references # <--- Import references
 from app.api import pdf, graph, lens, audio, citation, quiz, chat, social, references, timeline # <--- Import
 from app.api import pdf, graph, lens, audio, citation, quiz, chat, social, references, timeline, memory # <--- Import
+from app.api import pdf, graph, lens, audio, citation, quiz, chat, social, references, timeline, memory, search
+
+from app.services.ingest import ingest_pool, resume_pending_jobs
+from app.services.ai_answers import answer_pool, resume_pending_answers
+from app.services.pdf_extract import shutdown_pool
+from app.services.artifacts import artifact_pool
+from app.services.memory_tags import tag_pool, resume_pending_tags
+from app.services.chat_sessions import compact_pool
+from app.services.tts import speech
 
 Base.metadata.create_all(bind=engine)
 app = FastAPI(title="Synapse Backend")
 
+# Background workers (PDF ingestion, document artifacts, community AI answers, memory tags, chat compaction)
+@app.on_event("startup")
+async def start_workers():
+    await asyncio.to_thread(gemini_ai.cache.purge_expired)
+    await asyncio.to_thread(speech.trim_cache)
+    ingest_pool.start()
+    await resume_pending_jobs()
+    artifact_pool.start()
+    answer_pool.start()
+    await resume_pending_answers()
+    tag_pool.start()
+    await resume_pending_tags()
+    compact_pool.start()
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await ingest_pool.stop()
+    await artifact_pool.stop()
+    await answer_pool.stop()
+    await tag_pool.stop()
+    await compact_pool.stop()
+    shutdown_pool()
+    await async_engine.dispose()
+
 # CORS Setup
 app.add_middleware(
     CORSMiddleware,
@@ -39,6 +73,14 @@ async def test_ai_route(question: str = "Explain Quantum Computing in 1 sentence
     answer = await gemini_ai.generate_response(question)
     return {"question": question, "ai_answer": answer}
 
+@app.get("/api/ai-stats")
+def ai_stats_route():
+    """
+    Hit/miss counters of the Gemini response cache, the latency it saved,
+    and how many callers were coalesced onto an in-flight request.
+    """
+    return gemini_ai.stats()
+
 app.include_router(pdf.router, prefix="/api/pdf", tags=["PDF"])
 app.include_router(graph.router, prefix="/api/graph", tags=["Graph"])
 app.include_router(lens.router, prefix="/api/lens", tags=["Lens"])
@@ -49,4 +91,5 @@ app.include_router(chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(social.router, prefix="/api/social", tags=["Social"])
 app.include_router(references.router, prefix="/api/references", tags=["References"]) # <--- Register
 app.include_router(timeline.router, prefix="/api/timeline", tags=["Timeline"])
-app.include_router(memory.router, prefix="/api/memory", tags=["Memory"]) # <--- Register
\ No newline at end of file
+app.include_router(memory.router, prefix="/api/memory", tags=["Memory"]) # <--- Register
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
\ No newline at end of file
@@ -0,0 +1,203 @@
+import hashlib
+from sqlalchemy import LargeBinary, bindparam, inspect, text
+from app.core.database import engine, Base
+from app.core.types import compress_text, decompress_text, is_encoded
+from app.models import models  # noqa: F401  (registers every table on Base)
+from app.services.related import term_vector
+from app.services.search import normalize_tags
+
+BATCH = 200
+
+# Columns stored through CompressedText: (table, primary key, column)
+COMPRESSED_COLUMNS = [
+    ("document_contents", "content_hash", "raw_text"),
+    ("document_contents", "content_hash", "summary"),
+    ("document_pages", "id", "content"),
+    ("document_chunks", "id", "content"),
+]
+
+print("♻️  Migrating database in place (data is kept)...")
+
+# 1. Create tables that do not exist yet
+Base.metadata.create_all(bind=engine)
+
+
+def existing_columns(table: str) -> set[str]:
+    return {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+# 2. Add columns that were introduced after a table was first created
+with engine.begin() as conn:
+    for table in Base.metadata.sorted_tables:
+        present = existing_columns(table.name)
+        for column in table.columns:
+            if column.name not in present and not column.primary_key:
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                print(f"➕ {table.name}.{column.name}")
+
+# Indexes added to existing tables (create_all only creates them with new tables)
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+# 3. Move text stored on documents (before content deduplication) to document_contents.
+# That text was cut to the first 10 pages and the file itself is gone, so these contents
+# are keyed by sha256 of the text rather than of the file and flagged legacy: the next
+# upload of the same PDF re-ingests it in full and re-links them (see ingest.relink_legacy)
+moved = 0
+if "raw_text" in existing_columns("documents"):
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, raw_text, summary FROM documents WHERE content_hash IS NULL AND raw_text IS NOT NULL"
+        )).fetchall()
+        for doc_id, raw_text, summary in rows:
+            content_hash = hashlib.sha256(raw_text.encode("utf-8")).hexdigest()
+            known = conn.execute(
+                text("SELECT 1 FROM document_contents WHERE content_hash = :h"), {"h": content_hash}
+            ).first()
+            if not known:
+                conn.execute(
+                    text(
+                        "INSERT INTO document_contents (content_hash, raw_text, summary, preview, status, legacy) "
+                        "VALUES (:h, :raw_text, :summary, :preview, 'ready', :legacy)"
+                    ).bindparams(bindparam("raw_text", type_=LargeBinary), bindparam("summary", type_=LargeBinary)),
+                    {
+                        "h": content_hash,
+                        "raw_text": compress_text(raw_text),
+                        "summary": compress_text(summary) if summary else None,
+                        "preview": " ".join((summary or "").split())[:280] or None,
+                        "legacy": True,
+                    },
+                )
+            conn.execute(
+                text("UPDATE documents SET content_hash = :h, status = 'ready' WHERE id = :id"),
+                {"h": content_hash, "id": doc_id},
+            )
+        moved = len(rows)
+        print(f"📦 Moved text of {moved} documents to document_contents.")
+
+        conn.execute(text("ALTER TABLE documents DROP COLUMN raw_text"))
+        conn.execute(text("ALTER TABLE documents DROP COLUMN summary"))
+        print("🗑️  Dropped documents.raw_text and documents.summary.")
+
+# Contents migrated before the legacy flag existed: every upload since has an ingest job
+with engine.begin() as conn:
+    conn.execute(
+        text(
+            "UPDATE document_contents SET legacy = :legacy WHERE legacy IS NULL AND content_hash NOT IN "
+            "(SELECT content_hash FROM ingest_jobs WHERE content_hash IS NOT NULL)"
+        ),
+        {"legacy": True},
+    )
+    conn.execute(text("UPDATE document_contents SET legacy = :legacy WHERE legacy IS NULL"), {"legacy": False})
+    legacy_count = conn.execute(
+        text("SELECT COUNT(*) FROM document_contents WHERE legacy = :legacy"), {"legacy": True}
+    ).scalar()
+if legacy_count:
+    print(
+        f"⚠️  {legacy_count} contents predate deduplication: they hold only the first 10 pages and will "
+        "not match a new upload of the same PDF by file hash. Re-uploading the PDF re-ingests it in "
+        "full and moves their documents over."
+    )
+
+# 4. Postgres: compressed columns must be bytea (legacy text is kept as UTF-8 bytes)
+if engine.dialect.name == "postgresql":
+    with engine.begin() as conn:
+        for table, _, column in COMPRESSED_COLUMNS:
+            col = next(c for c in inspect(engine).get_columns(table) if c["name"] == column)
+            if not isinstance(col["type"], LargeBinary):
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA USING convert_to({column}, 'UTF8')"
+                ))
+                print(f"🔁 {table}.{column} -> BYTEA")
+
+# 5. Compress every value that is still stored as plain text, in batches
+before = after = converted = 0
+for table, pk, column in COMPRESSED_COLUMNS:
+    last = None
+    while True:
+        with engine.begin() as conn:
+            where = f"WHERE {pk} > :last" if last is not None else ""
+            rows = conn.execute(
+                text(f"SELECT {pk}, {column} FROM {table} {where} ORDER BY {pk} LIMIT {BATCH}"),
+                {"last": last} if last is not None else {},
+            ).fetchall()
+            if not rows:
+                break
+            update = text(f"UPDATE {table} SET {column} = :value WHERE {pk} = :key").bindparams(
+                bindparam("value", type_=LargeBinary)
+            )
+            for key, raw in rows:
+                if raw is None or is_encoded(raw):
+                    continue
+                value = decompress_text(raw)
+                encoded = compress_text(value)
+                conn.execute(update, {"value": encoded, "key": key})
+                before += len(value.encode("utf-8"))
+                after += len(encoded)
+                converted += 1
+            last = rows[-1][0]
+
+print(f"🗜️  Compressed {converted} values: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+# 6. Search index and normalized tags for rows written before they existed
+indexed = 0
+with engine.begin() as conn:
+    memories = conn.execute(text(
+        "SELECT id, user_id, content, tags, timestamp FROM memories "
+        "WHERE id NOT IN (SELECT ref_id FROM search_entries WHERE kind = 'memory')"
+    )).fetchall()
+    for mem_id, user_id, content, tags, timestamp in memories:
+        normalized = normalize_tags(tags)
+        conn.execute(
+            text("INSERT INTO search_entries (user_id, kind, ref_id, body, tags, timestamp) "
+                 "VALUES (:u, 'memory', :id, :body, :tags, :ts)"),
+            {"u": user_id, "id": mem_id, "body": content, "tags": ", ".join(normalized) or None, "ts": timestamp},
+        )
+        for tag in normalized:
+            conn.execute(
+                text("INSERT INTO memory_tags (memory_id, user_id, tag) VALUES (:id, :u, :tag)"),
+                {"id": mem_id, "u": user_id, "tag": tag},
+            )
+    conn.execute(text("UPDATE memories SET tag_status = 'tagged' WHERE tag_status IS NULL AND tags IS NOT NULL"))
+
+    documents = conn.execute(text(
+        "SELECT d.id, d.user_id, d.filename, d.upload_date, c.summary FROM documents d "
+        "JOIN document_contents c ON c.content_hash = d.content_hash "
+        "WHERE d.status = 'ready' AND d.id NOT IN (SELECT ref_id FROM search_entries WHERE kind = 'document')"
+    )).fetchall()
+    for doc_id, user_id, filename, upload_date, summary in documents:
+        conn.execute(
+            text("INSERT INTO search_entries (user_id, kind, ref_id, title, body, timestamp) "
+                 "VALUES (:u, 'document', :id, :title, :body, :ts)"),
+            {"u": user_id, "id": doc_id, "title": filename,
+             "body": decompress_text(summary) if summary is not None else None, "ts": upload_date},
+        )
+    indexed = len(memories) + len(documents)
+print(f"🔎 Indexed {indexed} memories/documents for search.")
+
+# 7. Related-papers vectors for contents ingested before they existed
+vectorized = 0
+while True:
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            f"SELECT content_hash, raw_text FROM document_contents "
+            f"WHERE term_vector IS NULL AND raw_text IS NOT NULL LIMIT {BATCH}"
+        )).fetchall()
+        if not rows:
+            break
+        update = text("UPDATE document_contents SET term_vector = :v WHERE content_hash = :h").bindparams(
+            bindparam("v", type_=LargeBinary)
+        )
+        for content_hash, raw in rows:
+            conn.execute(update, {"v": term_vector(decompress_text(raw)), "h": content_hash})
+        vectorized += len(rows)
+print(f"🧭 Computed {vectorized} related-papers vectors.")
+
+# 8. SQLite only gives the space back to the filesystem on VACUUM
+if engine.dialect.name == "sqlite" and (moved or converted):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM"))
+
+print("✅ Migration finished!")
@@ -25,6 +25,8 @@ export default function ChatInterface() {
   const [isLoading, setIsLoading] = useState(false);
   const [documents, setDocuments] = useState<DocOption[]>([]);
   const [selectedDocId, setSelectedDocId] = useState<number | null>(null);
+  // Server-side conversation: follow-ups only send the new question
+  const [sessionId, setSessionId] = useState<string | null>(null);
 
   const [mode, setMode] = useState("Standard");
   const [audience, setAudience] = useState("Undergrad");
@@ -36,8 +38,8 @@ export default function ChatInterface() {
       if (!userId) return;
       try {
         const res = await api.get("/api/pdf/list", { params: { user_id: userId } });
-        setDocuments(res.data);
-        if (res.data.length > 0) setSelectedDocId(res.data[0].id);
+        setDocuments(res.data.items);
+        if (res.data.items.length > 0) setSelectedDocId(res.data.items[0].id);
       } catch (err) {
         console.error("Failed to load docs", err);
       }
@@ -45,6 +47,11 @@ export default function ChatInterface() {
     fetchDocs();
   }, [userId]);
 
+  // A session is tied to one paper; switching papers starts a new conversation
+  useEffect(() => {
+    setSessionId(null);
+  }, [selectedDocId]);
+
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
   }, [messages]);
@@ -59,14 +66,47 @@ export default function ChatInterface() {
     setIsLoading(true);
 
     try {
-      const response = await api.post("/api/chat/ask", {
-        question,
-        doc_id: selectedDocId,
-        mode,
-        audience
+      // Stream the answer (SSE) so the first words show up as soon as Gemini writes them
+      const response = await fetch(`${api.defaults.baseURL}/api/chat/ask/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({
+          question,
+          doc_id: selectedDocId,
+          mode,
+          audience,
+          session_id: sessionId,
+          user_id: userId,
+        }),
       });
+      if (!response.ok || !response.body) throw new Error("Stream failed");
+
+      setMessages(prev => [...prev, { role: "ai", content: "" }]);
+      const appendToAnswer = (text: string) =>
+        setMessages(prev => {
+          const last = prev[prev.length - 1];
+          return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+        });
 
-      setMessages(prev => [...prev, { role: "ai", content: response.data.answer }]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for (const event of events) {
+          const dataLine = event.split("\n").find(line => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const data = JSON.parse(dataLine.slice(6));
+          if (data.session_id) setSessionId(data.session_id);
+          if (data.delta) appendToAnswer(data.delta);
+          if (data.error) appendToAnswer(data.error);
+        }
+      }
     } catch {
       setMessages(prev => [...prev, { role: "ai", content: "Sorry — something interrupted my reasoning." }]);
     } finally {
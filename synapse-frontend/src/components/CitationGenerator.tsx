@@ -5,26 +5,21 @@ import { Quote, Copy, Check, Loader2, BookMarked } from "lucide-react";
 import api from "@/lib/api";
 
 interface Props {
-  filename: string;
-  summary: string;
+  docId: number;
 }
 
-export default function CitationGenerator({ filename, summary }: Props) {
+export default function CitationGenerator({ docId }: Props) {
   const [format, setFormat] = useState("APA");
   const [citation, setCitation] = useState("");
   const [loading, setLoading] = useState(false);
   const [copied, setCopied] = useState(false);
 
   const handleGenerate = async () => {
-    if (!summary) return;
+    if (!docId) return;
     setLoading(true);
     setCitation("");
     try {
-      const res = await api.post("/api/citation/generate", {
-        filename,
-        text_snippet: summary,
-        format,
-      });
+      const res = await api.get(`/api/citation/${docId}`, { params: { format } });
       setCitation(res.data.citation);
     } catch {
       setCitation("Error generating citation. Please try again.");
@@ -69,7 +64,7 @@ export default function CitationGenerator({ filename, summary }: Props) {
 
         <button
           onClick={handleGenerate}
-          disabled={loading || !summary}
+          disabled={loading || !docId}
           className="bg-indigo-600 hover:bg-indigo-500 disabled:opacity-40 px-5 py-2 rounded-xl text-white text-sm font-medium transition flex items-center justify-center gap-2"
         >
           {loading ? (
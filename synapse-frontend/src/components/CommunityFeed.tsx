@@ -18,6 +18,8 @@ interface Question {
   title: string;
   content: string;
   user_id: string;
+  answer_count: number;
+  ai_pending: boolean;
 }
 
 interface Answer {
@@ -28,11 +30,17 @@ interface Answer {
   votes: number;
 }
 
+// Polls for the background AI answer, 2s apart: give up after two minutes
+const AI_POLL_LIMIT = 60;
+
 export default function CommunityFeed() {
   const { userId } = useAuth();
   const [questions, setQuestions] = useState<Question[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [activeQ, setActiveQ] = useState<Question | null>(null);
   const [answers, setAnswers] = useState<Answer[]>([]);
+  const [aiPending, setAiPending] = useState(false);
+  const [aiPolls, setAiPolls] = useState(0);
   const [newTitle, setNewTitle] = useState("");
   const [newContent, setNewContent] = useState("");
   const [newAnswer, setNewAnswer] = useState("");
@@ -43,18 +51,28 @@ export default function CommunityFeed() {
     fetchQuestions();
   }, []);
 
-  const fetchQuestions = async () => {
-    const res = await api.get("/api/social/questions");
-    setQuestions(res.data);
+  const fetchQuestions = async (cursor?: string) => {
+    const res = await api.get("/api/social/feed", { params: { cursor } });
+    setQuestions((prev) => (cursor ? [...prev, ...res.data.items] : res.data.items));
+    setNextCursor(res.data.next_cursor);
   };
 
-  const openQuestion = async (q: Question) => {
+  const openQuestion = async (q: Question, polling = false) => {
     setActiveQ(q);
+    setAiPolls((n) => (polling ? n + 1 : 0));
     const res = await api.get(`/api/social/questions/${q.id}`);
     setAnswers(res.data.answers);
+    setAiPending(res.data.ai_pending);
     setDebateText(null);
   };
 
+  // The AI answer is written in the background; refresh until it lands
+  useEffect(() => {
+    if (!activeQ || !aiPending || aiPolls >= AI_POLL_LIMIT) return;
+    const timer = setTimeout(() => openQuestion(activeQ, true), 2000);
+    return () => clearTimeout(timer);
+  }, [activeQ, aiPending, answers, aiPolls]);
+
   const handlePostQuestion = async () => {
     if (!userId || !newTitle) return;
     setLoading(true);
@@ -81,7 +99,8 @@ export default function CommunityFeed() {
   };
 
   const handleVote = async (ansId: number) => {
-    await api.post(`/api/social/answers/${ansId}/vote`);
+    if (!userId) return; // Votes are per user
+    await api.post(`/api/social/answers/${ansId}/vote`, { user_id: userId });
     if (activeQ) openQuestion(activeQ);
   };
 
@@ -126,8 +145,20 @@ export default function CommunityFeed() {
               <p className="text-xs text-zinc-500 truncate">
                 {q.content}
               </p>
+              <p className="text-[10px] text-zinc-600 mt-1">
+                {q.ai_pending ? "AI is answering…" : `${q.answer_count} answers`}
+              </p>
             </button>
           ))}
+
+          {nextCursor && (
+            <button
+              onClick={() => fetchQuestions(nextCursor)}
+              className="w-full text-xs text-zinc-400 hover:text-white py-2"
+            >
+              Load more
+            </button>
+          )}
         </div>
 
         {/* ASK */}
@@ -174,6 +205,12 @@ export default function CommunityFeed() {
             </div>
 
             <div className="flex-1 overflow-y-auto p-6 space-y-6">
+              {aiPending && (
+                <div className="rounded-2xl p-4 border bg-indigo-600/10 border-indigo-500/20 text-xs text-indigo-400 flex items-center gap-1">
+                  <Bot className="w-3 h-3" />
+                  Synapse AI is writing an answer…
+                </div>
+              )}
               {answers.map((ans) => (
                 <div
                   key={ans.id}
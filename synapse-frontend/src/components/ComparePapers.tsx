@@ -6,6 +6,8 @@ import { useAuth } from "@clerk/nextjs";
 import { ArrowRightLeft, Loader2, FileText } from "lucide-react";
 import ReactMarkdown from "react-markdown";
 
+const MAX_PAPERS = 10;
+
 interface Doc {
   id: number;
   filename: string;
@@ -14,25 +16,29 @@ interface Doc {
 export default function ComparePapers() {
   const { userId } = useAuth();
   const [docs, setDocs] = useState<Doc[]>([]);
-  const [doc1, setDoc1] = useState<number | null>(null);
-  const [doc2, setDoc2] = useState<number | null>(null);
+  const [selected, setSelected] = useState<number[]>([]);
   const [comparison, setComparison] = useState("");
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
     if (userId) {
-      api.get(`/api/pdf/list?user_id=${userId}`).then(res => setDocs(res.data));
+      api.get(`/api/pdf/list?user_id=${userId}`).then(res => setDocs(res.data.items));
     }
   }, [userId]);
 
+  const toggleDoc = (id: number) => {
+    setSelected(prev =>
+      prev.includes(id)
+        ? prev.filter(d => d !== id)
+        : prev.length < MAX_PAPERS ? [...prev, id] : prev
+    );
+  };
+
   const handleCompare = async () => {
-    if (!doc1 || !doc2) return;
+    if (selected.length < 2) return;
     setLoading(true);
     try {
-      const res = await api.post("/api/pdf/compare", {
-        doc1_id: doc1,
-        doc2_id: doc2,
-      });
+      const res = await api.post("/api/pdf/compare", { doc_ids: selected });
       setComparison(res.data.comparison);
     } catch {
       setComparison("Comparison failed.");
@@ -41,7 +47,7 @@ export default function ComparePapers() {
     }
   };
 
-  const isReady = doc1 && doc2;
+  const isReady = selected.length >= 2;
   const showEmpty = docs.length < 2;
 
   return (
@@ -74,34 +80,27 @@ export default function ComparePapers() {
       )}
 
       {/* SELECTORS */}
-      <div className="grid grid-cols-1 md:grid-cols-[1fr_auto_1fr_auto] gap-4 items-end mb-8">
-        <select
-          className="bg-black/40 text-sm text-zinc-300 rounded-xl px-4 py-3 focus:ring-2 focus:ring-indigo-500 outline-none"
-          onChange={(e) => setDoc1(Number(e.target.value))}
-        >
-          <option>Select Paper A</option>
-          {docs.map(d => (
-            <option key={d.id} value={d.id}>
-              {d.filename}
-            </option>
-          ))}
-        </select>
-
-        <span className="hidden md:block text-zinc-500 font-medium text-center">
-          vs
-        </span>
-
-        <select
-          className="bg-black/40 text-sm text-zinc-300 rounded-xl px-4 py-3 focus:ring-2 focus:ring-indigo-500 outline-none"
-          onChange={(e) => setDoc2(Number(e.target.value))}
-        >
-          <option>Select Paper B</option>
-          {docs.map(d => (
-            <option key={d.id} value={d.id}>
-              {d.filename}
-            </option>
-          ))}
-        </select>
+      <div className="flex flex-col md:flex-row gap-4 md:items-end mb-8">
+        <div className="flex-1">
+          <p className="text-xs text-zinc-500 mb-2">
+            Select 2 to {MAX_PAPERS} papers ({selected.length} selected)
+          </p>
+          <div className="flex flex-wrap gap-2">
+            {docs.map(d => (
+              <button
+                key={d.id}
+                onClick={() => toggleDoc(d.id)}
+                className={`px-3 py-2 rounded-xl text-sm transition max-w-[240px] truncate ${
+                  selected.includes(d.id)
+                    ? "bg-indigo-600 text-white"
+                    : "bg-black/40 text-zinc-300 hover:bg-black/60"
+                }`}
+              >
+                {d.filename}
+              </button>
+            ))}
+          </div>
+        </div>
 
         <button
           onClick={handleCompare}
@@ -19,18 +19,18 @@ interface GraphData {
   links: { source: string; target: string }[];
 }
 
-export default function KnowledgeGraph({ summary }: { summary: string }) {
+export default function KnowledgeGraph({ docId, summary }: { docId: number; summary: string }) {
   const [data, setData] = useState<GraphData | null>(null);
   const [loading, setLoading] = useState(false);
   const containerRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
-    if (!summary) return;
+    if (!docId || !summary) return;
 
     const fetchGraph = async () => {
       setLoading(true);
       try {
-        const res = await api.post("/api/graph/generate", { summary });
+        const res = await api.get(`/api/graph/${docId}`);
         setData(res.data);
       } catch (err) {
         console.error("Graph Gen Error:", err);
@@ -40,7 +40,7 @@ export default function KnowledgeGraph({ summary }: { summary: string }) {
     };
 
     fetchGraph();
-  }, [summary]);
+  }, [docId, summary]);
 
   /* EMPTY STATE */
   if (!summary) {
@@ -3,34 +3,80 @@
 import { useState, useEffect } from "react";
 import api from "@/lib/api";
 import { useAuth } from "@clerk/nextjs";
-import { Brain, Plus, Hash, Loader2, Lightbulb, ArrowRight } from "lucide-react";
+import { Brain, Plus, Hash, Loader2, Lightbulb, ArrowRight, Search } from "lucide-react";
 import { CardSkeleton } from "./ui/Skeleton";
 
 interface Memory {
   id: number;
   content: string;
-  tags: string;
+  tags: string | null;
+  tag_status: string | null;
   timestamp: string;
 }
 
+interface Facet {
+  tag: string;
+  count: number;
+}
+
+interface SearchItem {
+  id: number;
+  snippet: string;
+  tags: string[];
+  timestamp: string;
+}
+
+// Refreshes while notes are being tagged, 2s apart: give up after two minutes
+const TAG_POLL_LIMIT = 60;
+
 export default function KnowledgeMemory() {
   const { userId } = useAuth();
   const [memories, setMemories] = useState<Memory[]>([]);
   const [newNote, setNewNote] = useState("");
   const [loading, setLoading] = useState(false);
   const [initialLoad, setInitialLoad] = useState(true);
+  const [query, setQuery] = useState("");
+  const [activeTag, setActiveTag] = useState<string | null>(null);
+  const [facets, setFacets] = useState<Facet[]>([]);
+  const [tagPolls, setTagPolls] = useState(0);
 
+  // Debounced: search runs server-side against the full-text index
   useEffect(() => {
-    if (userId) fetchMemories();
-  }, [userId]);
-
-  const fetchMemories = async () => {
-    setInitialLoad(true);
-    const res = await api.get(`/api/memory/list?user_id=${userId}`);
-    setMemories(res.data);
+    if (!userId) return;
+    const timer = setTimeout(() => fetchMemories(), query ? 250 : 0);
+    return () => clearTimeout(timer);
+  }, [userId, query, activeTag]);
+
+  const fetchMemories = async (quiet = false) => {
+    if (!quiet) setInitialLoad(true);
+    setTagPolls((n) => (quiet ? n + 1 : 0));
+    const res = await api.get("/api/search/", {
+      params: { user_id: userId, kind: "memory", q: query, tag: activeTag ?? undefined, limit: query || activeTag ? 100 : 1 },
+    });
+    setFacets(res.data.facets);
+
+    if (query || activeTag) {
+      setMemories(res.data.items.map((item: SearchItem) => ({
+        id: item.id,
+        content: item.snippet,
+        tags: item.tags.join(", "),
+        tag_status: "tagged",
+        timestamp: item.timestamp,
+      })));
+    } else {
+      const list = await api.get(`/api/memory/list?user_id=${userId}`);
+      setMemories(list.data);
+    }
     setInitialLoad(false);
   };
 
+  // Tags are added in the background; refresh until every note has them
+  useEffect(() => {
+    if (tagPolls >= TAG_POLL_LIMIT || !memories.some((m) => m.tag_status === "pending")) return;
+    const timer = setTimeout(() => fetchMemories(true), 2000);
+    return () => clearTimeout(timer);
+  }, [memories, tagPolls]);
+
   const handleSave = async () => {
     if (!newNote.trim()) return;
     setLoading(true);
@@ -75,6 +121,36 @@ export default function KnowledgeMemory() {
         </button>
       </div>
 
+      {/* SEARCH + TAG FACETS */}
+      <div className="mb-6 space-y-3">
+        <div className="flex items-center gap-2 bg-black/40 border border-zinc-700 rounded-xl px-4 py-2 focus-within:border-pink-500 transition">
+          <Search className="w-4 h-4 text-zinc-500" />
+          <input
+            value={query}
+            onChange={(e) => setQuery(e.target.value)}
+            placeholder="Search your memory…"
+            className="flex-1 bg-transparent text-sm text-zinc-200 outline-none"
+          />
+        </div>
+        {facets.length > 0 && (
+          <div className="flex flex-wrap gap-2">
+            {facets.map((f) => (
+              <button
+                key={f.tag}
+                onClick={() => setActiveTag(activeTag === f.tag ? null : f.tag)}
+                className={`text-[10px] uppercase font-bold px-2 py-1 rounded transition ${
+                  activeTag === f.tag
+                    ? "bg-pink-600 text-white"
+                    : "text-pink-400 bg-pink-900/20 hover:bg-pink-900/40"
+                }`}
+              >
+                #{f.tag} · {f.count}
+              </button>
+            ))}
+          </div>
+        )}
+      </div>
+
       {/* GRID */}
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-4">
 
@@ -97,7 +173,12 @@ export default function KnowledgeMemory() {
               “{mem.content}”
             </p>
             <div className="flex flex-wrap gap-2">
-              {mem.tags.split(",").map((tag, i) => (
+              {mem.tag_status === "pending" && (
+                <span className="text-[10px] uppercase font-bold text-zinc-500">
+                  Tagging…
+                </span>
+              )}
+              {(mem.tags || "").split(",").filter((tag) => tag.trim()).map((tag, i) => (
                 <span
                   key={i}
                   className="flex items-center gap-1 text-[10px] uppercase font-bold text-pink-400 bg-pink-900/20 px-2 py-1 rounded"
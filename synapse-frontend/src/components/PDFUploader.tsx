@@ -8,9 +8,13 @@ import KnowledgeGraph from './KnowledgeGraph';
 import SmartLensWrapper from './SmartLensWrapper';
 import CitationGenerator from './CitationGenerator';
 import QuizGenerator from './QuizGenerator';
+import RelatedPapers from './RelatedPapers';
 import { useAuth } from '@clerk/nextjs'; // <--- Import useAuth
 import ReferenceHighlighter from './ReferenceHighlighter';
 
+// Stop polling a job after this long; the paper shows up in the library once it is done
+const INGEST_POLL_TIMEOUT_MS = 10 * 60 * 1000;
+
 interface PDFResponse {
   id: number;
   filename: string;
@@ -29,7 +33,7 @@ export default function PDFUploader() {
 
     useEffect(() => {
     if (result?.id) {
-      api.post('/api/references/extract', { doc_id: result.id })
+      api.get(`/api/references/${result.id}`)
          .then(res => setReferences(res.data))
          .catch(err => console.error("Ref extract failed", err));
     }
@@ -59,7 +63,20 @@ export default function PDFUploader() {
       const response = await api.post('/api/pdf/upload', formData, {
         headers: { 'Content-Type': 'multipart/form-data' },
       });
-      setResult(response.data);
+
+      // 3. Ingestion runs in the background: poll the job until the summary is ready
+      let job = response.data;
+      const deadline = Date.now() + INGEST_POLL_TIMEOUT_MS;
+      while (job.status !== 'ready') {
+        if (job.status === 'failed') throw new Error(job.error || 'Ingestion failed');
+        if (Date.now() > deadline) {
+          setError("This paper is still processing. Check your library again in a few minutes.");
+          return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 1500));
+        job = (await api.get(`/api/pdf/jobs/${response.data.job_id}`)).data;
+      }
+      setResult({ id: response.data.id, filename: response.data.filename, summary: job.summary });
     } catch (err) {
       console.error(err);
       setError("Failed to upload PDF. Please try again.");
@@ -80,16 +97,12 @@ export default function PDFUploader() {
     try {
       setIsPlaying(true);
 
-      const response = await api.post('/api/audio/generate', 
-        { text: result.summary },
-        { responseType: 'blob' }
-      );
+      // The server streams MP3 segments as they are synthesized, so playback starts right away
+      const audio = new Audio(`${api.defaults.baseURL}/api/audio/documents/${result.id}`);
 
-      const audioUrl = URL.createObjectURL(response.data);
-      const audio = new Audio(audioUrl);
-      
       audio.onended = () => setIsPlaying(false);
-      audio.play();
+      audio.onerror = () => setIsPlaying(false);
+      await audio.play();
       setAudioElement(audio);
 
     } catch (err) {
@@ -177,7 +190,7 @@ export default function PDFUploader() {
                 {/* Summary Text wrapped in Smart Lens */}
                 <div className="prose dark:prose-invert max-w-none text-zinc-600 dark:text-zinc-300">
                     <h4 className="font-medium text-zinc-900 dark:text-zinc-100 mb-2">AI Summary & Key Takeaways:</h4>
-                    <SmartLensWrapper>
+                    <SmartLensWrapper docId={result.id}>
                         <div className="whitespace-pre-wrap leading-relaxed bg-zinc-50 dark:bg-black/30 p-4 rounded-lg border border-zinc-100 dark:border-zinc-800 cursor-text">
                             <ReferenceHighlighter text={result.summary} references={references} />
                         </div>
@@ -185,14 +198,17 @@ export default function PDFUploader() {
                 </div>
 
                 {/* Citation Generator */}
-                <CitationGenerator filename={result.filename} summary={result.summary} />
+                <CitationGenerator docId={result.id} />
+
+                {/* Related Papers (local similarity, no AI call) */}
+                <RelatedPapers docId={result.id} />
             </div>
 
             {/* Knowledge Graph */}
-            <KnowledgeGraph summary={result.summary} />
+            <KnowledgeGraph docId={result.id} summary={result.summary} />
 
             {/* Quiz Generator */}
-            <QuizGenerator summary={result.summary} />
+            <QuizGenerator docId={result.id} />
             
         </div>
       )}
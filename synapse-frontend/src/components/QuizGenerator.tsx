@@ -11,7 +11,7 @@ interface Question {
   answer: string;
 }
 
-export default function QuizGenerator({ summary }: { summary: string }) {
+export default function QuizGenerator({ docId }: { docId: number }) {
   const [questions, setQuestions] = useState<Question[]>([]);
   const [currentQ, setCurrentQ] = useState(0);
   const [score, setScore] = useState(0);
@@ -27,7 +27,7 @@ export default function QuizGenerator({ summary }: { summary: string }) {
     setQuestions([]);
     
     try {
-      const res = await api.post('/api/quiz/generate', { text: summary });
+      const res = await api.get(`/api/quiz/${docId}`);
       setQuestions(res.data);
     } catch (err) {
       alert("Failed to create quiz. Try again.");
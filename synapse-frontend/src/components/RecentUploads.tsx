@@ -8,7 +8,7 @@ import { useAuth } from "@clerk/nextjs";
 interface Doc {
   id: number;
   filename: string;
-  summary: string;
+  preview: string | null;
   upload_date: string;
 }
 
@@ -18,7 +18,7 @@ export default function RecentUploads() {
 
   useEffect(() => {
     if (isLoaded && userId) {
-      api.get(`/api/pdf/list?user_id=${userId}`).then(res => setDocs(res.data));
+      api.get(`/api/pdf/list?user_id=${userId}`).then(res => setDocs(res.data.items));
     }
   }, [userId, isLoaded]);
 
@@ -78,7 +78,7 @@ export default function RecentUploads() {
             </div>
 
             <p className="text-sm text-zinc-400 line-clamp-2">
-              {doc.summary}
+              {doc.preview}
             </p>
           </div>
         ))}
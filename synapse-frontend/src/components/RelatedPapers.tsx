@@ -0,0 +1,56 @@
+"use client";
+
+import { useState, useEffect } from "react";
+import { Network, FileText } from "lucide-react";
+import api from "@/lib/api";
+
+interface Props {
+  docId: number;
+}
+
+interface RelatedDoc {
+  id: number;
+  filename: string;
+  score: number;
+}
+
+export default function RelatedPapers({ docId }: Props) {
+  const [related, setRelated] = useState<RelatedDoc[]>([]);
+
+  useEffect(() => {
+    if (!docId) return;
+    api.get(`/api/pdf/related/${docId}`)
+      .then(res => setRelated(res.data.items))
+      .catch(() => setRelated([]));
+  }, [docId]);
+
+  if (related.length === 0) return null;
+
+  return (
+    <div className="mt-8 rounded-3xl bg-zinc-900/40 border border-white/10 p-6 space-y-4 shadow-lg shadow-black/20">
+
+      {/* HEADER */}
+      <div className="flex items-center gap-2">
+        <Network className="w-4 h-4 text-indigo-400" />
+        <h4 className="text-sm font-semibold text-white">
+          Related in Your Library
+        </h4>
+      </div>
+
+      {/* LIST */}
+      <ul className="space-y-2">
+        {related.map(doc => (
+          <li key={doc.id} className="flex items-center justify-between gap-3 bg-black/30 rounded-xl px-4 py-2">
+            <span className="flex items-center gap-2 text-sm text-zinc-300 truncate">
+              <FileText className="w-4 h-4 text-zinc-500 shrink-0" />
+              {doc.filename}
+            </span>
+            <span className="text-xs text-zinc-500 shrink-0">
+              {Math.round(doc.score * 100)}% similar
+            </span>
+          </li>
+        ))}
+      </ul>
+    </div>
+  );
+}
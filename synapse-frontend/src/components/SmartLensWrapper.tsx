@@ -4,13 +4,25 @@ import { useState, useRef, useEffect } from 'react';
 import { Sparkles, X, Loader2, AlertTriangle } from 'lucide-react';
 import api from '@/lib/api';
 
-export default function SmartLensWrapper({ children }: { children: React.ReactNode }) {
+export default function SmartLensWrapper({ children, docId }: { children: React.ReactNode; docId?: number }) {
   const containerRef = useRef<HTMLDivElement>(null);
+  const glossary = useRef<Map<string, string>>(new Map());
   const [coords, setCoords] = useState<{ x: number; y: number } | null>(null);
   const [selectedText, setSelectedText] = useState("");
   const [explanation, setExplanation] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
 
+  // 0. Prefetch the paper's glossary so most lookups need no request
+  useEffect(() => {
+    glossary.current = new Map();
+    if (!docId) return;
+    api.get(`/api/lens/glossary/${docId}`)
+      .then(res => {
+        for (const t of res.data.terms) glossary.current.set(t.term.toLowerCase(), t.explanation);
+      })
+      .catch(() => {}); // Falls back to /explain
+  }, [docId]);
+
   // 1. Detect Text Selection
   useEffect(() => {
     const handleSelection = () => {
@@ -54,11 +66,17 @@ export default function SmartLensWrapper({ children }: { children: React.ReactNo
   // 2. Fetch Definition
   const handleExplain = async (e: React.MouseEvent) => {
     e.stopPropagation();
+    const known = glossary.current.get(selectedText.toLowerCase());
+    if (known) {
+      setExplanation(known);
+      return;
+    }
     setLoading(true);
     try {
       const res = await api.post('/api/lens/explain', { 
         text: selectedText,
-        context: "User is reading a research summary."
+        context: "User is reading a research summary.",
+        doc_id: docId
       });
       setExplanation(res.data.explanation);
     } catch (err) {